@@ -0,0 +1,126 @@
+"""
+Admission control: token buckets and connection caps.
+
+Overload is rejected up front (HTTP 429 with Retry-After, or a WebSocket
+close with a retry hint) instead of letting a reconnect storm or a chatty
+client slow down every room. Limits can be tuned with environment
+variables; the per-IP limits are generous because a whole classroom often
+shares one public IP behind the school NAT.
+"""
+import os
+import time
+from typing import Dict, Tuple
+
+import metrics
+
+# WebSocket close codes
+CLOSE_TRY_AGAIN_LATER = 1013   # server overloaded / rate limited, client should retry
+CLOSE_POLICY_VIOLATION = 1008
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+IP_RATE = _env_float("ADMISSION_IP_RATE", 20)              # joins + socket connects per second per IP
+IP_BURST = _env_float("ADMISSION_IP_BURST", 200)
+MAX_SOCKETS_PER_ROOM = int(_env_float("ADMISSION_MAX_SOCKETS_PER_ROOM", 300))
+ROOM_CONNECT_RATE = _env_float("ADMISSION_ROOM_RATE", 50)  # socket connects per second per room
+# a full room must be able to (re)connect at once, e.g. every phone at game start
+ROOM_CONNECT_BURST = max(_env_float("ADMISSION_ROOM_BURST", MAX_SOCKETS_PER_ROOM), MAX_SOCKETS_PER_ROOM)
+SOCKET_MSG_RATE = _env_float("ADMISSION_MSG_RATE", 10)     # inbound messages per second per socket
+SOCKET_MSG_BURST = _env_float("ADMISSION_MSG_BURST", 30)
+# Spectator connects have their own per-IP bucket, so a lecture hall opening the
+# projector view cannot use up the joins of players behind the same NAT
+SPECTATOR_IP_RATE = _env_float("ADMISSION_SPECTATOR_IP_RATE", 20)
+SPECTATOR_IP_BURST = _env_float("ADMISSION_SPECTATOR_IP_BURST", 200)
+
+# Idle per-IP buckets are dropped once the table grows past this size
+_IP_TABLE_PRUNE_AT = 10000
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """Spend `cost` tokens. Returns (allowed, seconds until it would be allowed)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+_ip_buckets: Dict[str, TokenBucket] = {}
+_spectator_ip_buckets: Dict[str, TokenBucket] = {}
+
+
+def _prune_ip_buckets(buckets: Dict[str, TokenBucket]):
+    now = time.monotonic()
+    for ip, bucket in list(buckets.items()):
+        # a bucket that has refilled completely carries no state worth keeping
+        if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst:
+            del buckets[ip]
+
+
+def _take_ip(buckets: Dict[str, TokenBucket], ip: str, rate: float, burst: float, reason: str) -> Tuple[bool, float]:
+    bucket = buckets.get(ip)
+    if bucket is None:
+        if len(buckets) >= _IP_TABLE_PRUNE_AT:
+            _prune_ip_buckets(buckets)
+        bucket = buckets[ip] = TokenBucket(rate, burst)
+    ok, retry_after = bucket.take()
+    if not ok:
+        metrics.admission_rejected.inc(1, reason)
+    return ok, retry_after
+
+
+def allow_ip(ip: str) -> Tuple[bool, float]:
+    """Per-client-IP limit shared by /join-session and WebSocket connects."""
+    return _take_ip(_ip_buckets, ip, IP_RATE, IP_BURST, "ip")
+
+
+def allow_spectator_ip(ip: str) -> Tuple[bool, float]:
+    """Per-client-IP limit for spectator connects, separate from the player one."""
+    return _take_ip(_spectator_ip_buckets, ip, SPECTATOR_IP_RATE, SPECTATOR_IP_BURST, "spectator_ip")
+
+
+def room_connect_bucket() -> TokenBucket:
+    return TokenBucket(ROOM_CONNECT_RATE, ROOM_CONNECT_BURST)
+
+
+def socket_message_bucket() -> TokenBucket:
+    return TokenBucket(SOCKET_MSG_RATE, SOCKET_MSG_BURST)
+
+
+def admit_socket(ip: str, room_bucket: TokenBucket, open_sockets: int) -> Tuple[bool, float]:
+    """Decide whether a new room socket may connect. Returns (allowed, retry_after seconds)."""
+    ok, retry_after = allow_ip(ip)
+    if not ok:
+        return False, retry_after
+    if open_sockets >= MAX_SOCKETS_PER_ROOM:
+        metrics.admission_rejected.inc(1, "room_full")
+        return False, 5.0
+    ok, retry_after = room_bucket.take()
+    if not ok:
+        metrics.admission_rejected.inc(1, "room")
+    return ok, retry_after
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, int(seconds + 0.999)))}
+
+
+def close_reason(seconds: float) -> str:
+    return f"retry_after={max(1, int(seconds + 0.999))}"
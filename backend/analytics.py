@@ -0,0 +1,363 @@
+"""
+Cross-game analytics: question difficulty and fake effectiveness.
+
+When a game finishes, its per-round data (choices, submissions, jury votes,
+round_breakdown) is reduced once to a handful of counts per question and per
+player, and those counts are added into columnar aggregates keyed by
+(deck_id, Question_ID) and (deck_id, player). Queries are vectorized numpy
+rollups over the aggregate columns, so they cost the same after hundreds of
+games as after one and never rescan session data.
+
+Aggregates are saved to analytics/ after each recorded game (one file per
+shard in multi-process mode; queries merge the other shards' files).
+"""
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import sharding
+from fileutil import publish_atomic
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+
+# Count columns per (deck_id, Question_ID)
+QUESTION_COLUMNS = (
+    "rounds",              # times the question was played to the answer stage
+    "answers",             # stage-2 choices made (timed-out players are not counted)
+    "correct",             # ... that were the correct answer
+    "predefined_picks",    # ... that were the deck's Predefined_Fake
+    "player_fake_picks",   # ... that were another player's fake
+    "fakes_submitted",     # real fake submissions (not "No submission")
+    "no_submission",       # players who did not submit a fake
+    "jury_votes",          # jury ballots cast
+    "predefined_best",     # ballots naming the Predefined_Fake best fake
+    "predefined_worst",    # ballots naming it worst fake
+)
+
+# Count columns per (deck_id, player); "rounds" are rounds the player answered in
+PLAYER_COLUMNS = ("rounds", "correct", "fooled_others", "times_fooled", "jury_best_pts")
+
+NO_SUBMISSION = "No submission"
+HOST_PLAYER = "Host"  # jury ballots name the Predefined_Fake's author "Host"
+
+
+class ColumnTable:
+    """Append-only keyed table of float64 count columns, grown by doubling."""
+
+    def __init__(self, columns: Tuple[str, ...], capacity: int = 64):
+        self.columns = columns
+        self.keys: List[Tuple[str, str]] = []
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._data = np.zeros((len(columns), capacity))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rows(self, keys: List[Tuple[str, str]]) -> np.ndarray:
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is None:
+                row = self._index[key] = len(self.keys)
+                self.keys.append(key)
+            rows[i] = row
+        if len(self.keys) > self._data.shape[1]:
+            grown = np.zeros((len(self.columns), max(len(self.keys), 2 * self._data.shape[1])))
+            grown[:, :self._data.shape[1]] = self._data
+            self._data = grown
+        return rows
+
+    def add(self, keys: List[Tuple[str, str]], values: np.ndarray):
+        """Add a (len(keys), n_columns) block of counts; repeated keys accumulate."""
+        if not keys:
+            return
+        rows = self._rows(keys)  # may grow (replace) self._data, so resolve rows first
+        np.add.at(self._data.T, rows, values)
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[self.columns.index(name), :len(self.keys)]
+
+    def merged(self, others: List["ColumnTable"]) -> "ColumnTable":
+        out = ColumnTable(self.columns)
+        for table in [self] + others:
+            out.add(table.keys, table._data[:, :len(table.keys)].T)
+        return out
+
+    def snapshot(self):
+        return list(self.keys), self._data[:, :len(self.keys)].copy()
+
+    @staticmethod
+    def write(path: str, snapshot, extra: dict):
+        # temp file + rename so a concurrent reader never sees a partial file
+        keys, data = snapshot
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".npz")
+        os.close(fd)
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, data=data, meta=np.array(json.dumps({"keys": keys, **extra})))
+            publish_atomic(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, columns: Tuple[str, ...]):
+        with np.load(path) as f:
+            meta = json.loads(str(f["meta"]))
+            data = f["data"]
+        table = cls(columns)
+        table.add([tuple(k) for k in meta.pop("keys")], data.T)
+        return table, meta
+
+
+questions = ColumnTable(QUESTION_COLUMNS)
+players = ColumnTable(PLAYER_COLUMNS)
+deck_games: Dict[str, int] = {}
+
+_other_shards_cache: Dict[str, tuple] = {}  # path -> (mtime_ns, table, meta)
+
+
+def _store_path(kind: str, shard_id: int = sharding.SHARD_ID) -> str:
+    return os.path.join(ANALYTICS_DIR, f"{kind}-{shard_id}.npz")
+
+
+def _load_own():
+    global questions, players, deck_games
+    if os.path.isfile(_store_path("questions")):
+        questions, meta = ColumnTable.load(_store_path("questions"), QUESTION_COLUMNS)
+        deck_games = meta.get("deck_games", {})
+    if os.path.isfile(_store_path("players")):
+        players, _ = ColumnTable.load(_store_path("players"), PLAYER_COLUMNS)
+
+
+def snapshot() -> dict:
+    """Copy of the aggregates, taken on the event loop, for write() to persist."""
+    return {"questions": questions.snapshot(), "players": players.snapshot(), "deck_games": dict(deck_games)}
+
+
+def write(snap: dict):
+    """Persist a snapshot() (blocking; run it in a worker thread)."""
+    os.makedirs(ANALYTICS_DIR, exist_ok=True)
+    ColumnTable.write(_store_path("questions"), snap["questions"], {"deck_games": snap["deck_games"]})
+    ColumnTable.write(_store_path("players"), snap["players"], {})
+
+
+def _round_facts(entries: List[dict], choices: List[dict], subs: List[dict], votes: Dict[str, dict],
+                 breakdown: Dict[str, dict]):
+    """
+    Reduce one round to a question count row and per-player count rows.
+    `entries` are the round's answers (main._build_answer_set); choices are
+    attributed by their answer_id, so "No guess" placeholders added when
+    stage 2 times out (which have none) are not counted as answers.
+    """
+    n_answers = n_correct = n_predefined = n_player_fake = 0
+    player_rows: Dict[str, List[float]] = {}
+    for c in choices:
+        aid = c.get("answer_id")
+        if aid is None or not 0 <= aid < len(entries):
+            continue
+        entry = entries[aid]
+        n_answers += 1
+        row = player_rows.setdefault(c.get("player"), [0.0] * len(PLAYER_COLUMNS))
+        row[0] = 1
+        if entry["kind"] == "correct":
+            n_correct += 1
+            row[1] += 1
+            continue
+        row[3] += 1
+        if entry["kind"] == "predefined":
+            n_predefined += 1
+        elif any(author != c.get("player") for author in entry["authors"]):
+            n_player_fake += 1
+    for player, parts in breakdown.items():
+        if player == HOST_PLAYER:
+            continue
+        row = player_rows.setdefault(player, [0.0] * len(PLAYER_COLUMNS))
+        row[2] = parts.get("fool_pts", 0)
+        row[4] = parts.get("jury_best_pts", 0)
+
+    question_row = [
+        1,
+        n_answers,
+        n_correct,
+        n_predefined,
+        n_player_fake,
+        sum(1 for s in subs if s.get("text") and s.get("text") != NO_SUBMISSION),
+        sum(1 for s in subs if s.get("text") == NO_SUBMISSION),
+        len(votes),
+        sum(1 for v in votes.values() if v.get("best") == HOST_PLAYER),
+        sum(1 for v in votes.values() if v.get("worst") == HOST_PLAYER),
+    ]
+    return question_row, player_rows
+
+
+def record_game(sess: dict) -> bool:
+    """
+    Fold a finished session into the aggregates (once per session).
+    Only rounds that reached the answer stage are counted.
+    """
+    if sess.get("analytics_recorded"):
+        return False
+    sess["analytics_recorded"] = True
+    deck_id = sess.get("deck_id") or ""
+    q_keys, q_rows, p_keys, p_rows = [], [], [], []
+    for idx, question in sess.get("questions", {}).items():
+        entries = sess.get("round_answers", {}).get(idx)
+        if not entries:
+            continue
+        qid = str(question.get("Question_ID") or idx)
+        q_row, per_player = _round_facts(
+            entries,
+            sess.get("choices", {}).get(idx, []),
+            sess.get("submissions", {}).get(idx, []),
+            sess.get("jury_votes", {}).get(idx, {}),
+            sess.get("round_breakdown", {}).get(idx, {}),
+        )
+        q_keys.append((deck_id, qid))
+        q_rows.append(q_row)
+        for player, row in per_player.items():
+            if player:
+                p_keys.append((deck_id, player))
+                p_rows.append(row)
+    if not q_keys:
+        return False
+    questions.add(q_keys, np.array(q_rows, dtype=float))
+    players.add(p_keys, np.array(p_rows, dtype=float).reshape(-1, len(PLAYER_COLUMNS)))
+    deck_games[deck_id] = deck_games.get(deck_id, 0) + 1
+    return True
+
+
+def _other_shards(kind: str, columns: Tuple[str, ...]):
+    tables, metas = [], []
+    for shard in range(sharding.SHARD_COUNT):
+        path = _store_path(kind, shard)
+        if shard == sharding.SHARD_ID or not os.path.isfile(path):
+            continue
+        mtime = os.stat(path).st_mtime_ns
+        cached = _other_shards_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _other_shards_cache[path] = (mtime, *ColumnTable.load(path, columns))
+        tables.append(cached[1])
+        metas.append(cached[2])
+    return tables, metas
+
+
+def _view(kind: str):
+    """This shard's table merged with the other shards' saved tables."""
+    table, columns = (questions, QUESTION_COLUMNS) if kind == "questions" else (players, PLAYER_COLUMNS)
+    games = dict(deck_games)
+    if sharding.SHARD_COUNT == 1:
+        return table, games
+    others, metas = _other_shards(kind, columns)
+    for meta in metas:
+        for deck, n in meta.get("deck_games", {}).items():
+            games[deck] = games.get(deck, 0) + n
+    return table.merged(others), games
+
+
+def _rate(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def question_metrics(table: ColumnTable, deck_id: Optional[str] = None):
+    """Per-question derived metrics as arrays (optionally for one deck)."""
+    mask = np.array([k[0] == deck_id for k in table.keys], dtype=bool) if deck_id is not None \
+        else np.ones(len(table), dtype=bool)
+    col = {name: table.column(name)[mask] for name in table.columns}
+    wrong = col["answers"] - col["correct"]
+    return [k for k, m in zip(table.keys, mask) if m], col, {
+        "correct_rate": _rate(col["correct"], col["answers"]),
+        # share of all answers that went to the deck's Predefined_Fake
+        "predefined_fool_rate": _rate(col["predefined_picks"], col["answers"]),
+        # share of fooled players that the Predefined_Fake (rather than a player fake) caught
+        "predefined_share_of_fooled": _rate(col["predefined_picks"], wrong),
+        "player_fool_rate": _rate(col["player_fake_picks"], col["answers"]),
+        "predefined_jury_best_rate": _rate(col["predefined_best"], col["jury_votes"]),
+        "submission_rate": _rate(col["fakes_submitted"], col["fakes_submitted"] + col["no_submission"]),
+    }
+
+
+SORT_KEYS = {
+    "difficulty": ("correct_rate", False),            # hardest first
+    "fake_effectiveness": ("predefined_fool_rate", True),
+    "player_fooling": ("player_fool_rate", True),
+    "rounds": ("rounds", True),
+}
+
+
+def deck_question_stats(deck_id: str, sort: str = "difficulty", limit: Optional[int] = None,
+                        min_answers: int = 0) -> List[dict]:
+    table, _ = _view("questions")
+    keys, col, derived = question_metrics(table, deck_id)
+    if not keys:
+        return []
+    field, descending = SORT_KEYS[sort]
+    values = derived.get(field, col.get(field))
+    order = np.argsort(-values if descending else values, kind="stable")
+    order = order[col["answers"][order] >= min_answers]
+    if limit is not None:
+        order = order[:limit]
+    rows = []
+    for i in order:
+        row = {"question_id": keys[i][1]}
+        row.update({name: int(col[name][i]) for name in QUESTION_COLUMNS})
+        row.update({name: round(float(v[i]), 4) for name, v in derived.items()})
+        rows.append(row)
+    return rows
+
+
+def deck_summaries() -> List[dict]:
+    """One rollup row per deck: games, questions seen, overall correct / fool rates."""
+    table, games = _view("questions")
+    if not len(table):
+        return []
+    decks = sorted({k[0] for k in table.keys})
+    deck_idx = {d: i for i, d in enumerate(decks)}
+    codes = np.array([deck_idx[k[0]] for k in table.keys])
+
+    def per_deck(name):
+        return np.bincount(codes, weights=table.column(name), minlength=len(decks))
+
+    answers, correct = per_deck("answers"), per_deck("correct")
+    predefined, player_fake = per_deck("predefined_picks"), per_deck("player_fake_picks")
+    n_questions = np.bincount(codes, minlength=len(decks))
+    return [{
+        "deck_id": deck,
+        "games": games.get(deck, 0),
+        "questions": int(n_questions[i]),
+        "answers": int(answers[i]),
+        "correct_rate": round(float(_rate(correct, answers)[i]), 4),
+        "predefined_fool_rate": round(float(_rate(predefined, answers)[i]), 4),
+        "player_fool_rate": round(float(_rate(player_fake, answers)[i]), 4),
+    } for i, deck in enumerate(decks)]
+
+
+def deck_player_stats(deck_id: str, limit: Optional[int] = 10) -> List[dict]:
+    """Players of a deck, best foolers first (players are identified by display name)."""
+    table, _ = _view("players")
+    mask = np.array([k[0] == deck_id for k in table.keys], dtype=bool)
+    if not mask.any():
+        return []
+    names = [k[1] for k, m in zip(table.keys, mask) if m]
+    col = {name: table.column(name)[mask] for name in PLAYER_COLUMNS}
+    fool_per_round = _rate(col["fooled_others"], col["rounds"])
+    order = np.lexsort((-fool_per_round, -col["fooled_others"]))
+    if limit is not None:
+        order = order[:limit]
+    return [{
+        "player": names[i],
+        "rounds": int(col["rounds"][i]),
+        "correct_rate": round(float(_rate(col["correct"], col["rounds"])[i]), 4),
+        "fooled_others": int(col["fooled_others"][i]),
+        "fooled_per_round": round(float(fool_per_round[i]), 4),
+        "times_fooled": int(col["times_fooled"][i]),
+        "jury_best_pts": round(float(col["jury_best_pts"][i]), 4),
+    } for i in order]
+
+
+_load_own()
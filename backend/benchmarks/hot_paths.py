@@ -0,0 +1,345 @@
+"""
+Micro-benchmarks for backend hot paths, with stored baselines.
+
+Cases (each reports microseconds per call, best of several repeats):
+- parse_csv[N]            validate_and_parse_csv on an N-question deck
+- broadcast[N sockets]    _broadcast of a submission notice to N fake sockets
+- ws_fake[P players]      one "fake" message through the session_ws handler
+- ws_choice[P players]    one "choice" message through the session_ws handler
+- jury_results[P, J]      one "jury_results" scoring round (P players, J jurors)
+- session_status[P, Q]    get_session_status + JSON encoding of a large session
+- excel_report[R rows]    generate_excel_report (needs openpyxl)
+
+WebSocket cases drive the real session_ws coroutine with in-memory sockets,
+so they measure the handlers as they are, including admission and logging.
+Before timing anything, check_scoring() plays one round with duplicate fakes
+through the same handlers and fails if the points awarded at choice time and
+the jury_results breakdown disagree, so a fast but wrong handler cannot pass.
+
+Usage (from backend/):
+    python benchmarks/hot_paths.py                     # run and print
+    python benchmarks/hot_paths.py --save-baseline     # store results in baseline.json
+    python benchmarks/hot_paths.py --compare [--threshold 0.25]
+        exits with status 1 if any case is slower than baseline * (1 + threshold);
+        without --threshold, the threshold stored in the baseline file is used
+
+Baselines are only comparable on the same machine; re-save after hardware changes.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# keep logging and admission limits out of the measurements
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+for _name in ("ADMISSION_IP_RATE", "ADMISSION_IP_BURST", "ADMISSION_MSG_RATE", "ADMISSION_MSG_BURST",
+              "ADMISSION_ROOM_RATE", "ADMISSION_ROOM_BURST"):
+    os.environ.setdefault(_name, "1e9")
+
+import pandas as pd  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import main  # noqa: E402
+from deck_manager import validate_and_parse_csv  # noqa: E402
+from generate_game_summary import generate_excel_report  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+
+class FakeSocket:
+    """Just enough of starlette's WebSocket for session_ws, protocol and _broadcast."""
+
+    def __init__(self, inbound=()):
+        self.scope = {"subprotocols": []}
+        self.query_params = {}
+        self.headers = {}
+        self.client = SimpleNamespace(host="127.0.0.1")
+        self.state = SimpleNamespace(codec=main.protocol.JsonCodec)
+        self.inbound = list(inbound)
+        self.sent = 0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+    async def send_text(self, data):
+        self.sent += 1
+
+    async def send_bytes(self, data):
+        self.sent += 1
+
+    async def receive(self):
+        if not self.inbound:
+            return {"type": "websocket.disconnect", "code": 1000}
+        return {"type": "websocket.receive", "text": json.dumps(self.inbound.pop(0))}
+
+
+def _best_us(fn, per_call: int = 1) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number / per_call * 1e6
+
+
+def _new_room(loop, players: int, jurors: int = 0, listeners: int = 0) -> str:
+    """A session with P players in stage 1 of question 0, plus idle listener sockets."""
+    main.active_sessions.clear()
+    main.session_sockets.clear()
+    # create it the way the app does, so the session has every field the handlers expect
+    code = loop.run_until_complete(main.create_session(
+        main.SessionRequest(deck_id="bench.csv", enable_worst_fake=True)))["room_code"]
+    sess = main.active_sessions[code]
+    sess["players"] = [f"Player {i}" for i in range(players)]
+    sess["jurors"] = [f"Juror {j}" for j in range(jurors)]
+    sess["names"] = set(sess["players"]) | set(sess["jurors"])
+    question = {"Question_ID": "1", "Question_Text": "Why is the sky blue?",
+                "Correct_Answer": "Rayleigh scattering", "Predefined_Fake": "Ocean reflection", "Image_Link": None}
+    sess.update({
+        "status": "in-progress",
+        "current_index": 0,
+        "current_question": question,
+        "questions": {0: question},
+        "current_correct_answer": question["Correct_Answer"],
+        "timer_remaining": 30,
+        "current_stage": 1,
+        "stage_status": "running",
+    })
+    main.session_sockets[code] = [FakeSocket() for _ in range(listeners)]
+    return code
+
+
+def _drive(loop, code: str, messages) -> None:
+    loop.run_until_complete(main.session_ws(FakeSocket(messages), code))
+
+
+def check_scoring(loop, players: int = 12) -> None:
+    """
+    Scoring consistency for merged fakes: players in the same group submit
+    the same fake (up to case and spaces), so each group is one answer with
+    several authors. Choices (including picks of one's own fake, the correct
+    answer and the predefined fake) are scored by the "choice" handler; with
+    no jurors, each player's jury_results round_total must equal those points.
+    """
+    code = _new_room(loop, players=players + 1)  # the extra player never chooses, so stage 2 stays open
+    sess = main.active_sessions[code]
+    sess["current_stage"] = 2
+    sess["submissions"] = {0: [{"player": f"Player {i}", "text": f" Group {i // 3} fake " if i % 2 else f"group {i // 3} FAKE"}
+                               for i in range(players)]}
+    answers = main._build_answer_set(sess, sess["submissions"][0])
+    merged = [e for e in sess["answer_entries"] if len(e["authors"]) > 1]
+    assert merged, "expected duplicate fakes to be merged into shared answers"
+    _drive(loop, code, [{"type": "choice", "player": f"Player {i}", "answer_id": (i * 5) % len(answers)}
+                        for i in range(players)])
+    chose_at_choice_time = dict(sess["scores"])
+
+    sess["current_stage"], sess["stage_status"] = 3, "idle"
+    _drive(loop, code, [{"type": "jury_results"}])
+    breakdown = sess["round_breakdown"][0]
+    for p in sess["players"]:
+        expected = chose_at_choice_time.get(p, 0)
+        assert breakdown[p]["round_total"] == expected, (
+            f"{p}: choice handler awarded {expected} but jury_results breakdown says {breakdown[p]}")
+
+
+def bench_parse_csv(tmp: str, sizes=(10, 100, 1000)) -> dict:
+    out = {}
+    for n in sizes:
+        path = os.path.join(tmp, f"deck_{n}.csv")
+        pd.DataFrame([{
+            "Question_ID": i, "Question_Text": f"Question {i} about forces?", "Correct_Answer": f"Answer {i}",
+            "Predefined_Fake": f"Fake {i}", "Image_Link": f"img_{i}.png" if i % 3 == 0 else "",
+        } for i in range(n)]).to_csv(path, index=False)
+        assert validate_and_parse_csv(path)["status"] == "success"
+        out[f"parse_csv[{n}]"] = _best_us(lambda: validate_and_parse_csv(path))
+    return out
+
+
+def bench_broadcast(loop, sockets=(10, 100)) -> dict:
+    out = {}
+    for n in sockets:
+        code = _new_room(loop, players=n, listeners=n)
+        msg = {"type": "submission", "player": "Player 0"}
+        batch = 100
+
+        async def run():
+            for _ in range(batch):
+                await main._broadcast(code, msg)
+
+        out[f"broadcast[{n} sockets]"] = _best_us(lambda: loop.run_until_complete(run()), batch)
+    return out
+
+
+def bench_fake(loop, players: int = 100, listeners: int = 30) -> dict:
+    # one player never submits, so the stage stays open for the whole batch
+    code = _new_room(loop, players=players + 1, listeners=listeners)
+    messages = [{"type": "fake", "player": f"Player {i}", "text": f"fake by {i}"} for i in range(players)]
+
+    def run():
+        main.active_sessions[code]["submissions"] = {}
+        _drive(loop, code, list(messages))
+
+    return {f"ws_fake[{players} players]": _best_us(run, len(messages))}
+
+
+def bench_choice(loop, players: int = 100, listeners: int = 30) -> dict:
+    code = _new_room(loop, players=players + 1, listeners=listeners)
+    sess = main.active_sessions[code]
+    sess["current_stage"] = 2
+    sess["submissions"] = {0: [{"player": f"Player {i}", "text": f"fake by {i}"} for i in range(players)]}
+    answers = main._build_answer_set(sess, sess["submissions"][0])
+    messages = [{"type": "choice", "player": f"Player {i}", "answer_id": i % len(answers)} for i in range(players)]
+
+    def run():
+        sess["choices"] = {}
+        _drive(loop, code, list(messages))
+
+    return {f"ws_choice[{players} players]": _best_us(run, len(messages))}
+
+
+def bench_jury_results(loop, players: int = 100, jurors: int = 10, listeners: int = 30) -> dict:
+    code = _new_room(loop, players=players, jurors=jurors, listeners=listeners)
+    sess = main.active_sessions[code]
+    sess["current_stage"], sess["stage_status"] = 3, "idle"
+    sess["submissions"] = {0: [{"player": f"Player {i}", "text": f"fake by {i}"} for i in range(players)]}
+    main._build_answer_set(sess, sess["submissions"][0])
+    sess["choices"] = {0: [{"player": f"Player {i}", "text": f"fake by {(i + 7) % players}",
+                            "answer_id": sess["answer_ids"][f"fake by {(i + 7) % players}"]}
+                           for i in range(players)]}
+    sess["jury_votes"] = {0: {f"Juror {j}": {"best": f"Player {j}", "worst": f"Player {j + 1}"}
+                              for j in range(jurors)}}
+
+    def run():
+        _drive(loop, code, [{"type": "jury_results"}])
+
+    return {f"jury_results[{players}p,{jurors}j]": _best_us(run)}
+
+
+def bench_session_status(loop, players: int = 200, questions: int = 20) -> dict:
+    code = _new_room(loop, players=players)
+    sess = main.active_sessions[code]
+    names = sess["players"]
+    for q in range(questions):
+        sess["submissions"][q] = [{"player": n, "text": f"{n} fake for q{q}"} for n in names]
+        sess["choices"][q] = [{"player": n, "text": f"{names[(i + 1) % players]} fake for q{q}"}
+                              for i, n in enumerate(names)]
+        sess["round_breakdown"][q] = {n: {"correct_pts": 0, "fool_pts": 1, "jury_best_pts": 0.25,
+                                          "jury_worst_pts": 0, "round_total": 1.25} for n in names}
+    for n in names:
+        main._add_score(sess, n, questions * 1.25)
+
+    def run():
+        status = loop.run_until_complete(main.get_session_status(code))
+        json.dumps(jsonable_encoder(status))
+
+    return {f"session_status[{players}p,{questions}q]": _best_us(run)}
+
+
+def bench_excel_report(tmp: str, players: int = 30, rounds: int = 10) -> dict:
+    name = f"excel_report[{players * rounds} rows]"
+    if importlib.util.find_spec("openpyxl") is None:
+        return {name: None}
+    rows = [{"Round": r + 1, "Player_Name": f"Player {p}", "Submitted_Fake": f"fake {p}.{r}",
+             "Choice_Made": f"fake {(p + 1) % players}.{r}", "Choice_Author": f"Player {(p + 1) % players}",
+             "Times_Fooled_Others": 1} for r in range(rounds) for p in range(players)]
+    cwd = os.getcwd()
+    os.chdir(tmp)  # the report is written to the working directory
+    try:
+        assert generate_excel_report(rows) is not None
+        return {name: _best_us(lambda: generate_excel_report(rows))}
+    finally:
+        os.chdir(cwd)
+
+
+def run() -> dict:
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        check_scoring(loop)
+        with tempfile.TemporaryDirectory() as tmp:
+            results.update(bench_parse_csv(tmp))
+            results.update(bench_broadcast(loop))
+            results.update(bench_fake(loop))
+            results.update(bench_choice(loop))
+            results.update(bench_jury_results(loop))
+            results.update(bench_session_status(loop))
+            results.update(bench_excel_report(tmp))
+    finally:
+        main.active_sessions.clear()
+        main.session_sockets.clear()
+        loop.close()
+    return {name: (round(us, 2) if us is not None else None) for name, us in results.items()}
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Rows of (case, baseline_us, current_us, ratio, regressed)."""
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if current is None or base is None:
+            rows.append((name, base, current, None, False))
+            continue
+        ratio = current / base
+        rows.append((name, base, current, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="allowed slowdown before a case counts as regressed (0.25 = 25%%); "
+                             f"default: the baseline's, else {DEFAULT_THRESHOLD}")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--json", default=None, help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results_us": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if args.threshold is None:
+            args.threshold = stored.get("threshold", DEFAULT_THRESHOLD)
+        rows = compare(results, stored["results_us"], args.threshold)
+        print(f"{'case':<30}{'baseline us':>13}{'now us':>11}{'ratio':>8}")
+        for name, base, current, ratio, regressed in rows:
+            if ratio is None:
+                print(f"{name:<30}{'-' if base is None else base:>13}{'-' if current is None else current:>11}"
+                      f"{'skipped':>8}")
+            else:
+                print(f"{name:<30}{base:>13}{current:>11}{ratio:>8.2f}{'  REGRESSED' if regressed else ''}")
+        regressed = [r[0] for r in rows if r[4]]
+        if regressed:
+            print(f"{len(regressed)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressed)}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    else:
+        print(f"{'case':<30}{'us/call':>11}")
+        for name, us in results.items():
+            print(f"{name:<30}{'skipped' if us is None else us:>11}")
+
+    if args.save_baseline:
+        if args.threshold is None:
+            args.threshold = DEFAULT_THRESHOLD
+        with open(args.baseline, "w") as f:
+            json.dump({"threshold": args.threshold, "results_us": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,105 @@
+"""
+Bytes and CPU per message type for the JSON and MessagePack wire encodings.
+
+For a representative payload of every server->client message type this
+reports the raw frame size, the size after raw deflate (what
+permessage-deflate would put on the wire, without context takeover), and
+encode/decode time per frame.
+
+Usage (from backend/):
+    python benchmarks/protocol_bench.py [--players 20] [--json report.json]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protocol  # noqa: E402
+
+
+def sample_messages(players: int) -> dict:
+    names = [f"Player {i}" for i in range(players)]
+    question = {
+        "Question_ID": "7",
+        "Question_Text": "Why does a spinning figure skater speed up when pulling in their arms?",
+        "Correct_Answer": "Conservation of angular momentum",
+        "Predefined_Fake": "The ice gets slipperier",
+        "Image_Link": "/assets/skater.png",
+    }
+    answers = [question["Correct_Answer"], question["Predefined_Fake"]] + [f"{n} thinks friction vanishes" for n in names]
+    breakdown = {n: {"correct_pts": 1, "fool_pts": 2, "jury_best_pts": 0.3333, "jury_worst_pts": 0,
+                     "round_total": 3.3333} for n in names}
+    return {
+        "timer_update": {"type": "timer_update", "stage": 1, "remaining": 42, "paused": False, "status": "running"},
+        "question": {"type": "question", "index": 6, "question": question,
+                     "correctAnswer": question["Correct_Answer"]},
+        "submission": {"type": "submission", "player": names[0]},
+        "stage_ready": {"type": "stage_ready", "stage": 1, "reason": "all_submitted"},
+        "stage_transition": {"type": "stage_transition", "from_stage": 1, "to_stage": 2},
+        "answers": {"type": "answers", "answers": answers},
+        "jury_phase": {"type": "jury_phase", "fakes": [{"player": n, "text": a} for n, a in zip(names, answers[2:])],
+                       "enable_worst_fake": True},
+        "jury_vote_count": {"type": "jury_vote_count", "count": 2, "total_jurors": 3},
+        "round_scores": {"type": "round_scores", "breakdown": breakdown,
+                         "scores": {n: 4.5 for n in names}, "correct_answer": question["Correct_Answer"]},
+    }
+
+
+def _deflated_size(frame) -> int:
+    data = frame.encode("utf-8") if isinstance(frame, str) else frame
+    compressor = zlib.compressobj(wbits=-15)
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+
+def _per_call_us(fn, arg) -> float:
+    timer = timeit.Timer(lambda: fn(arg))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def run(players: int) -> dict:
+    codecs = [protocol.JsonCodec]
+    if protocol.msgpack is not None:
+        codecs.append(protocol.MsgpackCodec)
+    report = {}
+    for mtype, msg in sample_messages(players).items():
+        row = {}
+        for codec in codecs:
+            frame = codec.encode(msg)
+            assert codec.decode(frame) == msg, f"{codec.name} round trip changed {mtype}"
+            row[codec.name] = {
+                "bytes": len(frame.encode("utf-8") if isinstance(frame, str) else frame),
+                "deflate_bytes": _deflated_size(frame),
+                "encode_us": round(_per_call_us(codec.encode, msg), 3),
+                "decode_us": round(_per_call_us(codec.decode, frame), 3),
+            }
+        report[mtype] = row
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=20, help="players per room in the sample payloads")
+    parser.add_argument("--json", default=None, help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.players)
+    header = f"{'type':<18}{'codec':<9}{'bytes':>8}{'deflate':>9}{'enc us':>9}{'dec us':>9}"
+    print(header)
+    print("-" * len(header))
+    for mtype, row in report.items():
+        for name, r in row.items():
+            print(f"{mtype:<18}{name:<9}{r['bytes']:>8}{r['deflate_bytes']:>9}{r['encode_us']:>9}{r['decode_us']:>9}")
+    if protocol.msgpack is None:
+        print("msgpack is not installed; only JSON was measured.")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"players": args.players, "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Bulk deck import from a ZIP archive.
+
+The archive may hold any number of deck CSVs and images, in any folder
+layout (only base names matter, matching how /upload-deck stores files).
+Work is split so the event loop never blocks and memory stays bounded:
+- every member is streamed to disk in chunks, never read whole;
+- CSVs are validated with validate_and_parse_csv in a process pool and
+  published into decks/ with an atomic rename;
+- images are hashed and written from a thread pool, deduplicated by content,
+  and published with an atomic rename.
+Each deck's Image_Link references are checked against the archive and the
+existing assets folder, and a per-deck report is returned.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+import deck_writer
+from deck_manager import validate_and_parse_csv
+from fileutil import publish_atomic
+
+DECKS_DIR = "decks"
+ASSETS_DIR = "assets"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp")
+MAX_MEMBERS = 20000
+CHUNK_SIZE = 1024 * 1024
+
+
+def _wanted(info: zipfile.ZipInfo) -> bool:
+    name = info.filename
+    base = os.path.basename(name)
+    return not info.is_dir() and base and not base.startswith(".") and "__MACOSX/" not in name
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract(archive: zipfile.ZipFile, info: zipfile.ZipInfo, dest: str) -> str:
+    """Stream one member to `dest` and return its sha256."""
+    digest = hashlib.sha256()
+    with archive.open(info) as src, open(dest, "wb") as out:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def _ingest_image(archive: zipfile.ZipFile, info: zipfile.ZipInfo, assets_dir: str) -> dict:
+    """Write one image to assets/ atomically. Returns {name, sha256, status}."""
+    name = os.path.basename(info.filename)
+    fd, tmp_path = tempfile.mkstemp(dir=assets_dir, prefix=".import-")
+    os.close(fd)
+    try:
+        sha = _extract(archive, info, tmp_path)
+        final = os.path.join(assets_dir, name)
+        if os.path.isfile(final) and _file_sha256(final) == sha:
+            os.remove(tmp_path)
+            return {"name": name, "sha256": sha, "status": "unchanged"}
+        publish_atomic(tmp_path, final)
+        return {"name": name, "sha256": sha, "status": "written"}
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _image_refs(questions: List[dict]) -> List[str]:
+    """Local image file names referenced by parsed questions (URLs are not checked)."""
+    refs = []
+    for q in questions:
+        link = q.get("Image_Link")
+        if link and not link.lower().startswith("http"):
+            refs.append(os.path.basename(link))
+    return refs
+
+
+# One parse pool for the process, started lazily. The server already runs
+# threads (log listener, to_thread workers), so children are started with
+# forkserver/spawn rather than fork.
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _cpu_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+    return _cpu_pool
+
+
+def shutdown():
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+
+
+def _plan(archive: zipfile.ZipFile):
+    """Split members into decks and images, deduplicating by base name."""
+    decks: Dict[str, zipfile.ZipInfo] = {}
+    images: Dict[str, zipfile.ZipInfo] = {}
+    skipped: List[dict] = []
+    members = [i for i in archive.infolist() if _wanted(i)]
+    if len(members) > MAX_MEMBERS:
+        raise ValueError(f"Archive has {len(members)} files; the limit is {MAX_MEMBERS}")
+    for info in members:
+        base = os.path.basename(info.filename)
+        lower = base.lower()
+        if lower.endswith(".csv"):
+            if base in decks:
+                skipped.append({"file": info.filename, "reason": f"duplicate deck name {base}"})
+            else:
+                decks[base] = info
+        elif lower.endswith(IMAGE_EXTENSIONS):
+            # same name twice: keep the first copy and report the rest
+            images.setdefault(base, info)
+            if images[base] is not info:
+                skipped.append({"file": info.filename, "reason": f"duplicate image name {base}"})
+        else:
+            skipped.append({"file": info.filename, "reason": "not a CSV or image"})
+    return decks, images, skipped
+
+
+async def import_archive(fileobj, decks_dir: str = DECKS_DIR, assets_dir: str = ASSETS_DIR,
+                         max_workers: Optional[int] = None) -> dict:
+    """Import every deck and image from a seekable ZIP file object and return a report."""
+    loop = asyncio.get_running_loop()
+    os.makedirs(decks_dir, exist_ok=True)
+    os.makedirs(assets_dir, exist_ok=True)
+
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a valid ZIP archive: {e}")
+
+    # staging lives inside decks/ so publishing a deck is an atomic rename
+    with archive, tempfile.TemporaryDirectory(dir=decks_dir, prefix=".import-") as staging, \
+            ThreadPoolExecutor(max_workers=max_workers or min(8, (os.cpu_count() or 1) * 2)) as io_pool:
+        decks, images, skipped = await loop.run_in_executor(io_pool, _plan, archive)
+
+        # 1. stage CSVs and write images concurrently (ZipFile.open is safe across threads)
+        staged = {name: os.path.join(staging, name) for name in decks}
+        csv_jobs = [loop.run_in_executor(io_pool, _extract, archive, info, staged[name])
+                    for name, info in decks.items()]
+        image_jobs = [loop.run_in_executor(io_pool, _ingest_image, archive, info, assets_dir)
+                      for info in images.values()]
+        # a member that cannot be read (bad CRC, encrypted, unsupported compression) fails only its deck
+        extracted = await asyncio.gather(*csv_jobs, return_exceptions=True)
+        image_results = await asyncio.gather(*image_jobs, return_exceptions=True)
+        results: Dict[str, object] = {name: RuntimeError(f"Could not read from archive: {r}")
+                                      for name, r in zip(decks, extracted) if isinstance(r, BaseException)}
+
+        # 2. parse and validate decks in parallel processes
+        to_parse = [name for name in decks if name not in results]
+        cpu_pool = _get_cpu_pool()
+        parsed = await asyncio.gather(*(
+            loop.run_in_executor(cpu_pool, validate_and_parse_csv, staged[name]) for name in to_parse
+        ), return_exceptions=True)
+        if any(isinstance(r, BrokenProcessPool) for r in parsed):
+            shutdown()  # a crashed worker breaks the pool; the next import starts a fresh one
+        results.update(zip(to_parse, parsed))
+
+        # 3. check image references and publish valid decks
+        written_images = {r["name"] for r in image_results if isinstance(r, dict)}
+        deck_reports = []
+        for name in decks:
+            result = results[name]
+            report = {"deck_id": name}
+            if isinstance(result, BaseException):
+                report.update(status="error", error=str(result) or type(result).__name__)
+                deck_reports.append(report)
+                continue
+            if result.get("status") != "success":
+                report.update(status="error", error=result.get("message", "Invalid deck"))
+                deck_reports.append(report)
+                continue
+            questions = result["data"]
+            missing = sorted({ref for ref in _image_refs(questions)
+                              if ref not in written_images and not os.path.isfile(os.path.join(assets_dir, ref))})
+            await deck_writer.forget(name)  # pending editor changes must not overwrite the import
+            publish_atomic(staged[name], os.path.join(decks_dir, name))
+            report.update(status="imported", questions=len(questions), missing_images=missing)
+            deck_reports.append(report)
+
+    image_errors = [{"file": info.filename, "reason": str(r)}
+                    for info, r in zip(images.values(), image_results) if isinstance(r, BaseException)]
+    return {
+        "decks": deck_reports,
+        "imported": sum(1 for d in deck_reports if d["status"] == "imported"),
+        "failed": sum(1 for d in deck_reports if d["status"] == "error"),
+        "images": {
+            "written": sum(1 for r in image_results if isinstance(r, dict) and r["status"] == "written"),
+            "unchanged": sum(1 for r in image_results if isinstance(r, dict) and r["status"] == "unchanged"),
+            "errors": image_errors,
+        },
+        "skipped": skipped,
+    }
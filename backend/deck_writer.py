@@ -0,0 +1,268 @@
+"""
+Deck writes: per-question patches, coalesced and atomic.
+
+The editor autosaves often and usually changes one question, so instead of
+rebuilding and rewriting the whole CSV on the event loop for every save:
+- a deck being edited is held in memory and patches are applied there;
+- the CSV is written from a worker thread, at most once per burst of edits
+  (FLUSH_DEBOUNCE after the last edit, never later than FLUSH_MAX_DELAY
+  after the first unsaved one);
+- every write goes to a temp file in decks/, is fsynced and then renamed
+  over the deck, so readers never see a half-written file;
+- each deck has a version (starting from the file's mtime) that patches
+  must quote, so concurrent editors cannot silently overwrite each other.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from fileutil import publish_atomic
+from log_config import get_logger, log_event
+
+DECKS_DIR = "decks"
+FLUSH_DEBOUNCE = 0.5     # seconds of quiet before a pending deck is written
+FLUSH_MAX_DELAY = 3.0    # upper bound on how long an edit can stay unwritten
+DECK_COLUMNS = ["Question_ID", "Question_Text", "Correct_Answer", "Predefined_Fake", "Image_Link"]
+
+logger = get_logger("deck_writer")
+
+
+class VersionConflict(Exception):
+    def __init__(self, current: int):
+        super().__init__(f"Deck changed since version was read (current version {current})")
+        self.current = current
+
+
+class _ChangedOnDisk(Exception):
+    """The deck file was replaced by someone else (upload, ZIP import, another worker)."""
+
+
+class _DeckState:
+    def __init__(self, path: str):
+        self.path = path
+        self.rows: List[dict] = []
+        self.columns: List[str] = list(DECK_COLUMNS)
+        self.version = 0
+        self.disk_mtime = 0
+        self.dirty_since: Optional[float] = None
+        self.last_change = 0.0
+        self.lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.dirty_since is not None
+
+
+_states: Dict[str, _DeckState] = {}
+
+
+def _deck_path(filename: str) -> str:
+    return os.path.join(DECKS_DIR, filename)
+
+
+def _version_of(mtime_ns: int) -> int:
+    # microseconds, so the number stays exact in JavaScript
+    return mtime_ns // 1000
+
+
+def _read_rows(path: str):
+    df = pd.read_csv(path, keep_default_na=False, dtype=str)
+    return list(df.columns), df.to_dict("records"), os.stat(path).st_mtime_ns
+
+
+def _mtime_or_none(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(path: str, rows: List[dict], columns: List[str], expect_mtime: Optional[int] = None) -> int:
+    """
+    Write rows to `path` via temp file + fsync + rename. Returns the new mtime_ns.
+    With `expect_mtime`, raises _ChangedOnDisk instead if the file is no longer
+    the one the rows were based on.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            pd.DataFrame(rows, columns=columns).to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # checked as late as possible, right before the rename
+        if expect_mtime is not None and _mtime_or_none(path) != expect_mtime:
+            raise _ChangedOnDisk(path)
+        publish_atomic(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return os.stat(path).st_mtime_ns
+
+
+async def _load(filename: str) -> _DeckState:
+    """In-memory state for a deck, (re)loaded if the file changed behind our back."""
+    path = _deck_path(filename)
+    state = _states.get(filename)
+    if state is None:
+        state = _states[filename] = _DeckState(path)
+    async with state.lock:
+        if state.dirty:
+            if _mtime_or_none(path) == state.disk_mtime:
+                return state
+            _drop_pending(state)
+        if not os.path.isfile(path):
+            _states.pop(filename, None)
+            raise FileNotFoundError(filename)
+        if os.stat(path).st_mtime_ns != state.disk_mtime:
+            columns, rows, mtime = await asyncio.to_thread(_read_rows, path)
+            state.columns = columns + [c for c in DECK_COLUMNS if c not in columns]
+            state.rows, state.disk_mtime, state.version = rows, mtime, _version_of(mtime)
+    return state
+
+
+async def get_version(filename: str) -> int:
+    """Current version of a deck (raises FileNotFoundError)."""
+    return (await _load(filename)).version
+
+
+def _apply(state: _DeckState, update: List[dict], add: List[dict], delete: List[str]):
+    """Validate the whole patch first, then apply it, so a bad patch changes nothing."""
+    index = {str(row.get("Question_ID")): i for i, row in enumerate(state.rows)}
+    for change in update:
+        if str(change["Question_ID"]) not in index:
+            raise ValueError(f"Question_ID {change['Question_ID']} not found")
+    for qid in delete:
+        if str(qid) not in index:
+            raise ValueError(f"Question_ID {qid} not found")
+    new_ids = [str(q["Question_ID"]) for q in add]
+    if len(set(new_ids)) != len(new_ids) or any(qid in index and qid not in delete for qid in new_ids):
+        raise ValueError("Added questions must have new, unique Question_IDs")
+
+    for change in update:
+        row = state.rows[index[str(change["Question_ID"])]]
+        # fields left out of the change (None) keep their current value
+        row.update({key: value for key, value in change.items() if value is not None})
+    if delete:
+        doomed = {str(qid) for qid in delete}
+        state.rows = [row for row in state.rows if str(row.get("Question_ID")) not in doomed]
+    for question in add:
+        state.rows.append({key: ("" if value is None else value) for key, value in question.items()})
+
+
+async def apply_patch(filename: str, base_version: int, update: List[dict] = (), add: List[dict] = (),
+                      delete: List[str] = ()) -> int:
+    """
+    Apply a question-level patch and schedule a coalesced write.
+    Raises FileNotFoundError, VersionConflict or ValueError. Returns the new version.
+    """
+    state = await _load(filename)
+    if base_version != state.version:
+        raise VersionConflict(state.version)
+    _apply(state, list(update), list(add), list(delete))
+    now = time.monotonic()
+    state.version += 1
+    state.last_change = now
+    if state.dirty_since is None:
+        state.dirty_since = now
+    if state.flush_task is None or state.flush_task.done():
+        state.flush_task = asyncio.create_task(_flush_when_quiet(state))
+    return state.version
+
+
+async def replace(filename: str, rows: List[dict]) -> int:
+    """Write a whole deck now (atomically, off the loop). Returns the new version."""
+    path = _deck_path(filename)
+    state = _states.get(filename)
+    if state is None:
+        state = _states[filename] = _DeckState(path)
+    async with state.lock:
+        columns = list(rows[0].keys()) if rows else list(DECK_COLUMNS)
+        mtime = await asyncio.to_thread(_write_atomic, path, rows, columns)
+        state.rows = [dict(r) for r in rows]
+        state.columns = columns
+        state.dirty_since = None
+        state.disk_mtime = mtime
+        state.version = max(state.version + 1, _version_of(mtime))
+        return state.version
+
+
+def _drop_pending(state: _DeckState):
+    """
+    The file was replaced behind our back (in sharded mode possibly by another
+    worker, where forget() could not reach this state), so the newer file wins
+    and the edits based on the old one are dropped; the next _load rereads it
+    and patches quoting the old version get a VersionConflict.
+    """
+    log_event(logger, "deck_edits_dropped", logging.WARNING, deck=state.path, reason="file changed on disk")
+    state.dirty_since = None
+    state.disk_mtime = 0
+
+
+async def _write_pending(state: _DeckState):
+    async with state.lock:
+        if not state.dirty:
+            return
+        rows = [dict(r) for r in state.rows]
+        dirty_since, state.dirty_since = state.dirty_since, None
+        try:
+            state.disk_mtime = await asyncio.to_thread(
+                _write_atomic, state.path, rows, state.columns, state.disk_mtime)
+        except _ChangedOnDisk:
+            _drop_pending(state)
+        except Exception:
+            # keep the edits pending; the next flush retries them
+            if state.dirty_since is None:
+                state.dirty_since = dirty_since
+            raise
+
+
+async def _flush_when_quiet(state: _DeckState):
+    while state.dirty:
+        now = time.monotonic()
+        due = min(state.last_change + FLUSH_DEBOUNCE, state.dirty_since + FLUSH_MAX_DELAY)
+        if due > now:
+            await asyncio.sleep(due - now)
+            continue
+        await _write_pending(state)
+
+
+async def flush(filename: str):
+    """Write a deck's pending edits now, if any (used before reading the file)."""
+    state = _states.get(filename)
+    if state is not None and state.dirty:
+        await _write_pending(state)
+
+
+async def flush_all():
+    for state in list(_states.values()):
+        if state.dirty:
+            await _write_pending(state)
+
+
+async def forget(filename: str):
+    """
+    Drop in-memory state and pending edits for a deck that is being deleted or
+    replaced from outside (upload, ZIP import), and wait for a write already in
+    progress, so no coalesced flush can land on top of the new file.
+    """
+    state = _states.pop(filename, None)
+    if state is None:
+        return
+    if state.flush_task is not None:
+        state.flush_task.cancel()
+    async with state.lock:
+        state.dirty_since = None
@@ -0,0 +1,51 @@
+"""
+Per-room sequenced event log.
+
+Every room-wide broadcast is stamped with a monotonically increasing `seq`
+and kept in a bounded ring buffer. A reconnecting client that reports the
+last seq it saw can be sent just the events it missed; if it fell further
+behind than the buffer reaches, it gets a single snapshot instead.
+
+Timer ticks are not sequenced or stored: they are superseded every second,
+so a reconnecting client only needs the current timer state.
+"""
+from collections import deque
+from typing import List, Optional
+
+EVENT_LOG_CAPACITY = 512
+
+# Broadcast types that are not sequenced (state that is resent as "current" on reconnect)
+VOLATILE_TYPES = frozenset({"timer_update"})
+
+
+class EventLog:
+    def __init__(self, capacity: int = EVENT_LOG_CAPACITY):
+        self.seq = 0
+        self._events = deque(maxlen=capacity)
+        self._evicted_seq = 0  # highest seq that has fallen out of the buffer
+
+    def stamp(self, msg: dict) -> dict:
+        """Return `msg` stamped with the next seq (and keep it), or unchanged if volatile."""
+        if msg.get("type") in VOLATILE_TYPES:
+            return msg
+        self.seq += 1
+        stamped = {**msg, "seq": self.seq}
+        if len(self._events) == self._events.maxlen:
+            self._evicted_seq = self._events[0]["seq"]
+        self._events.append(stamped)
+        return stamped
+
+    def since(self, last_seq: int) -> Optional[List[dict]]:
+        """
+        Events after `last_seq`, oldest first. None when they can no longer be
+        replayed (evicted, or a seq this log never issued) and a snapshot is needed.
+        """
+        if last_seq < self._evicted_seq or last_seq > self.seq:
+            return None
+        missed = []
+        for event in reversed(self._events):
+            if event["seq"] <= last_seq:
+                break
+            missed.append(event)
+        missed.reverse()
+        return missed
@@ -0,0 +1,19 @@
+"""
+Publishing files atomically.
+
+Files are written to a temp file in the target's directory (usually with
+tempfile.mkstemp) and then renamed over the target, so readers never see a
+half-written file. mkstemp creates files as 0600, so before the rename the
+temp file gets the mode open() would have given it under the process umask.
+"""
+import os
+
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+
+def publish_atomic(tmp_path: str, final_path: str):
+    """Give a finished temp file the normal file mode and rename it over `final_path`."""
+    os.chmod(tmp_path, FILE_MODE)
+    os.replace(tmp_path, final_path)
@@ -0,0 +1,68 @@
+"""
+Per-session ranked leaderboard.
+
+Scores change a few points at a time (choice, jury_results), so instead of
+re-sorting the whole scoreboard on every status poll the session keeps a
+SortedList of (-score, name) that is updated in O(log N) per change.
+"""
+from typing import Dict, List, Optional
+
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    def __init__(self):
+        self._scores: Dict[str, float] = {}
+        self._ranked = SortedList()         # (-score, name), best first; ties broken by name
+        self._round_ranks: Dict[str, int] = {}  # ranks at the end of the previous round
+
+    def __len__(self):
+        return len(self._scores)
+
+    def add(self, player: str, points: float) -> float:
+        """Add (or subtract) points for a player and return the new score."""
+        old = self._scores.get(player)
+        if old is not None:
+            self._ranked.remove((-old, player))
+        new = (old or 0) + points
+        self._scores[player] = new
+        self._ranked.add((-new, player))
+        return new
+
+    def score(self, player: str) -> Optional[float]:
+        return self._scores.get(player)
+
+    def rank(self, player: str) -> Optional[int]:
+        """1-based competition rank (tied scores share a rank), or None if the player has no score."""
+        score = self._scores.get(player)
+        if score is None:
+            return None
+        return self._ranked.bisect_left((-score,)) + 1
+
+    def top(self, k: int) -> List[dict]:
+        """The k best entries as [{player, score, rank}], best first."""
+        out = []
+        for neg_score, player in self._ranked.islice(0, max(k, 0)):
+            if out and out[-1]["score"] == -neg_score:
+                rank = out[-1]["rank"]
+            else:
+                rank = self._ranked.bisect_left((neg_score,)) + 1
+            out.append({"player": player, "score": -neg_score, "rank": rank})
+        return out
+
+    def items(self) -> List[list]:
+        """Full scoreboard as [[player, score], ...], best first."""
+        return [[player, -neg_score] for neg_score, player in self._ranked]
+
+    def close_round(self) -> Dict[str, Optional[int]]:
+        """
+        Snapshot ranks at the end of a round and return each player's movement
+        since the previous snapshot (positive = moved up, None = newly ranked).
+        """
+        ranks = {player: self.rank(player) for player in self._scores}
+        deltas = {
+            player: (self._round_ranks[player] - rank if player in self._round_ranks else None)
+            for player, rank in ranks.items()
+        }
+        self._round_ranks = ranks
+        return deltas
@@ -0,0 +1,503 @@
+"""
+End-to-end load generator for the game server.
+
+Starts the FastAPI app locally (or targets an already running one) and drives
+ROOMS x PLAYERS x JURORS simulated clients through the full game flow:
+/create-session -> /join-session -> /ws/session/{code}, then for every question
+question -> fake -> host_next(1) -> choice -> host_next(2) -> jury_phase ->
+jury_vote -> jury_results, and finally end_game.
+
+Latencies are measured client side (all clients live in this process, so one
+monotonic clock is shared):
+- "message" latency: a client's action until the server's reaction reaches
+  the client that observes it (fake -> host sees submission, jury_vote ->
+  juror sees jury_vote_count, last choice -> host sees stage_ready).
+- "broadcast" latency: a host trigger until each room member receives the
+  resulting broadcast (question, answers, stage_transition, jury_phase,
+  round_scores, game_finished).
+
+Server CPU and RSS are sampled while the run is in progress. The report is
+written as JSON so runs can be compared across commits.
+
+Usage:
+    python load_test.py --rooms 10 --players 20 --jurors 3 --questions 3 \
+        --output load_report.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+
+import protocol
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ServerClosed(Exception):
+    """The server closed a client's socket (e.g. 1013 from admission control)."""
+
+
+class Stats:
+    """Collects latency samples (seconds) by metric name."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = []
+        self.server_closes = {}  # close code -> sockets the server closed on us
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def error(self, where: str, exc: BaseException):
+        self.errors.append(f"{where}: {type(exc).__name__}: {exc}")
+
+    def summary(self) -> dict:
+        out = {}
+        for name, values in sorted(self.samples.items()):
+            values = sorted(values)
+            out[name] = {
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 50) * 1000, 3),
+                "p95_ms": round(_percentile(values, 95) * 1000, 3),
+                "p99_ms": round(_percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        return out
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Client:
+    """
+    One simulated WebSocket participant.
+    A background reader keeps every received message (except timer ticks) so
+    tests can wait for a message type with an optional predicate.
+    """
+
+    def __init__(self, name: str, role: str, codec=protocol.JsonCodec):
+        self.name = name
+        self.role = role
+        self.codec = codec
+        self.ws = None
+        self._backlog = {}   # type -> [(arrival_time, msg), ...]
+        self._waiters = []   # [(type, predicate, future), ...]
+        self._reader = None
+        self._closing = False
+        self.closed_by_server = None  # (code, reason) if the server closed the socket
+        self.timer_updates = 0
+
+    async def connect(self, ws_url: str):
+        subprotocols = [protocol.MSGPACK_SUBPROTOCOL] if self.codec is protocol.MsgpackCodec else None
+        self.ws = await websockets.connect(ws_url, max_size=None, subprotocols=subprotocols)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                now = time.perf_counter()
+                msg = self.codec.decode(raw)
+                mtype = msg.get("type")
+                if mtype == "timer_update":
+                    self.timer_updates += 1
+                    continue
+                for waiter in self._waiters:
+                    wtype, pred, fut = waiter
+                    if wtype == mtype and not fut.done() and pred(msg):
+                        fut.set_result((now, msg))
+                        self._waiters.remove(waiter)
+                        break
+                else:
+                    self._backlog.setdefault(mtype, []).append((now, msg))
+        except websockets.ConnectionClosed:
+            pass
+        if not self._closing:
+            # fail waiting steps now instead of letting them time out
+            self.closed_by_server = (self.ws.close_code, self.ws.close_reason or "")
+            error = ServerClosed(f"{self.name} closed by server: code {self.ws.close_code} {self.ws.close_reason}")
+            for _, _, fut in self._waiters:
+                if not fut.done():
+                    fut.set_exception(error)
+            self._waiters.clear()
+
+    def clear(self, mtype: str = None):
+        """Drop buffered messages (all, or one type) left over from earlier steps."""
+        if mtype is None:
+            self._backlog.clear()
+        else:
+            self._backlog.pop(mtype, None)
+
+    async def expect(self, mtype: str, predicate=None, timeout: float = 30.0):
+        """Wait for the next message of `mtype` matching `predicate`; returns (arrival_time, msg)."""
+        pred = predicate or (lambda m: True)
+        buffered = self._backlog.get(mtype, [])
+        for i, (t, msg) in enumerate(buffered):
+            if pred(msg):
+                del buffered[i]
+                return t, msg
+        if self.closed_by_server:
+            code, reason = self.closed_by_server
+            raise ServerClosed(f"{self.name} closed by server: code {code} {reason}")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((mtype, pred, fut))
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            if not fut.done():
+                self._waiters = [w for w in self._waiters if w[2] is not fut]
+
+    async def send(self, msg: dict) -> float:
+        t = time.perf_counter()
+        await self.ws.send(self.codec.encode(msg))
+        return t
+
+    async def close(self):
+        self._closing = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await self._reader
+
+
+def _http_json(method: str, url: str, body: dict = None) -> dict:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+async def _http(stats: Stats, name: str, method: str, url: str, body: dict = None) -> dict:
+    t0 = time.perf_counter()
+    result = await asyncio.to_thread(_http_json, method, url, body)
+    stats.add(f"http.{name}", time.perf_counter() - t0)
+    return result
+
+
+async def _think(args):
+    if args.think_max > 0:
+        await asyncio.sleep(random.uniform(args.think_min, args.think_max) / 1000)
+
+
+def _make_question(i: int) -> dict:
+    return {
+        "Question_ID": str(i + 1),
+        "Question_Text": f"Load test question {i + 1}: why does the apple fall?",
+        "Correct_Answer": f"Gravity pulls it down ({i})",
+        "Predefined_Fake": f"The apple is tired ({i})",
+        "Image_Link": None,
+    }
+
+
+async def _broadcast_latency(stats: Stats, name: str, t0: float, clients, predicate=None):
+    results = await asyncio.gather(*(c.expect(name, predicate) for c in clients))
+    for arrival, _ in results:
+        stats.add(f"broadcast.{name}", arrival - t0)
+
+
+async def run_room(args, base_url: str, ws_base: str, stats: Stats, room_no: int):
+    session = await _http(stats, "create_session", "POST", f"{base_url}/create-session", {
+        "deck_id": "load_test.csv",
+        "stage1_duration": args.stage_duration,
+        "stage2_duration": args.stage_duration,
+        "enable_worst_fake": args.jurors > 1,
+    })
+    code = session["room_code"]
+
+    codec = protocol.MsgpackCodec if args.encoding == "msgpack" else protocol.JsonCodec
+    host = Client("Host", "host", codec)
+    players = [Client(f"R{room_no}P{i}", "player", codec) for i in range(args.players)]
+    jurors = [Client(f"R{room_no}J{i}", "juror", codec) for i in range(args.jurors)]
+    members = players + jurors
+
+    for c in members:
+        await _http(stats, "join_session", "POST", f"{base_url}/join-session", {
+            "room_code": code, "player_name": c.name, "player_type": c.role,
+        })
+
+    ws_url = f"{ws_base}/ws/session/{code}"
+    for c in [host] + members:
+        t0 = time.perf_counter()
+        await c.connect(ws_url)
+        stats.add("connect.ws", time.perf_counter() - t0)
+
+    try:
+        for qi in range(args.questions):
+            for c in [host] + members:
+                c.clear()
+            question = _make_question(qi)
+
+            # Stage 1: question broadcast, then every player submits a fake
+            t0 = await host.send({"type": "question", "index": qi, "question": question,
+                                  "correctAnswer": question["Correct_Answer"]})
+            await _broadcast_latency(stats, "question", t0, members)
+
+            async def submit_fake(p):
+                await _think(args)
+                sent = await p.send({"type": "fake", "player": p.name, "text": f"{p.name} fake for {qi}"})
+                arrival, _ = await host.expect("submission", lambda m, n=p.name: m.get("player") == n)
+                stats.add("message.fake", arrival - sent)
+            await asyncio.gather(*(submit_fake(p) for p in players))
+            await host.expect("stage_ready", lambda m: m.get("stage") == 1)
+
+            # Stage 2: answers broadcast, then every player chooses
+            t0 = await host.send({"type": "host_next", "stage": 1})
+            await _broadcast_latency(stats, "answers", t0, [host] + members)
+            # every answer is distinct, so the answers list has one entry (and answer_id) per answer
+            pool_size = 2 + len(players)
+
+            last_sent = [0.0]
+
+            async def choose(p):
+                await _think(args)
+                last_sent[0] = max(last_sent[0], await p.send({"type": "choice", "player": p.name,
+                                                               "answer_id": random.randrange(pool_size)}))
+            await asyncio.gather(*(choose(p) for p in players))
+            arrival, _ = await host.expect("stage_ready", lambda m: m.get("stage") == 2)
+            stats.add("message.choice_round_complete", arrival - last_sent[0])
+
+            t0 = await host.send({"type": "host_next", "stage": 2})
+            await _broadcast_latency(stats, "stage_transition", t0, [host] + members,
+                                     lambda m: m.get("to_stage") == 3)
+
+            # Stage 3: jury phase, votes, results
+            if jurors:
+                t0 = await host.send({"type": "jury_phase", "question_index": qi})
+                await _broadcast_latency(stats, "jury_phase", t0, [host] + members)
+                candidates = [p.name for p in players] + ["Host"]
+
+                async def vote(j):
+                    await _think(args)
+                    j.clear("jury_vote_count")
+                    best = random.choice(candidates)
+                    worst = random.choice([c for c in candidates if c != best]) if len(candidates) > 1 else None
+                    sent = await j.send({"type": "jury_vote", "juror_name": j.name,
+                                         "best_fake_player": best, "worst_fake_player": worst})
+                    arrival, _ = await j.expect("jury_vote_count", lambda m: m.get("count", 0) >= 1)
+                    stats.add("message.jury_vote", arrival - sent)
+                await asyncio.gather(*(vote(j) for j in jurors))
+
+            t0 = await host.send({"type": "jury_results"})
+            await _broadcast_latency(stats, "round_scores", t0, [host] + members)
+
+        t0 = await host.send({"type": "end_game"})
+        await _broadcast_latency(stats, "game_finished", t0, [host] + members)
+    finally:
+        for c in [host] + members:
+            if c.closed_by_server:
+                code = str(c.closed_by_server[0])
+                stats.server_closes[code] = stats.server_closes.get(code, 0) + 1
+        await asyncio.gather(*(c.close() for c in [host] + members), return_exceptions=True)
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of the server process (psutil if available, else /proc)."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.rss_samples = []
+        self.cpu_start = None
+        self.cpu_end = None
+        self.wall_start = None
+        self.wall_end = None
+        self._task = None
+        try:
+            import psutil
+            self._proc = psutil.Process(pid)
+        except Exception:
+            self._proc = None
+
+    def _read(self):
+        """Return (cpu_seconds, rss_bytes) or (None, None) if unavailable."""
+        if self._proc is not None:
+            times = self._proc.cpu_times()
+            return times.user + times.system, self._proc.memory_info().rss
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            cpu = (int(fields[11]) + int(fields[12])) / ticks
+            rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+            return cpu, rss
+        except (OSError, ValueError, IndexError):
+            return None, None
+
+    async def _loop(self):
+        while True:
+            _, rss = self._read()
+            if rss is not None:
+                self.rss_samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.cpu_start, _ = self._read()
+        self.wall_start = time.perf_counter()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self.cpu_end, rss = self._read()
+        if rss is not None:
+            self.rss_samples.append(rss)
+        self.wall_end = time.perf_counter()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self) -> dict:
+        if self.cpu_start is None or self.cpu_end is None:
+            return {"available": False}
+        cpu = self.cpu_end - self.cpu_start
+        wall = self.wall_end - self.wall_start
+        rss = sorted(self.rss_samples)
+        return {
+            "available": True,
+            "cpu_seconds": round(cpu, 3),
+            "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+            "rss_peak_mb": round(rss[-1] / 2**20, 2) if rss else None,
+            "rss_p50_mb": round(_percentile(rss, 50) / 2**20, 2) if rss else None,
+        }
+
+
+def start_server(port: int, analytics_dir: str) -> subprocess.Popen:
+    """Launch uvicorn on main:app from the backend folder and wait until it answers."""
+    # every simulated client shares 127.0.0.1, so lift the per-IP admission limit
+    env = dict(os.environ)
+    env.setdefault("ADMISSION_IP_RATE", "100000")
+    env.setdefault("ADMISSION_IP_BURST", "100000")
+    # all clients of a room connect back to back, so lift the per-room connect rate too
+    env.setdefault("ADMISSION_ROOM_RATE", "100000")
+    env.setdefault("ADMISSION_ROOM_BURST", "100000")
+    # simulated games must not end up in the real deck analytics
+    env["ANALYTICS_DIR"] = analytics_dir
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited early with code {proc.returncode}")
+        try:
+            _http_json("GET", f"http://127.0.0.1:{port}/")
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return ""
+
+
+async def run(args) -> dict:
+    stats = Stats()
+    server = None
+    analytics_dir = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        pid = args.server_pid
+    else:
+        analytics_dir = tempfile.TemporaryDirectory(prefix="fip-load-analytics-")
+        server = start_server(args.port, analytics_dir.name)
+        base_url = f"http://127.0.0.1:{args.port}"
+        pid = server.pid
+    ws_base = base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+
+    sampler = ResourceSampler(pid) if pid else None
+    try:
+        if sampler:
+            sampler.start()
+        t0 = time.perf_counter()
+        results = await asyncio.gather(
+            *(run_room(args, base_url, ws_base, stats, r) for r in range(args.rooms)),
+            return_exceptions=True,
+        )
+        wall = time.perf_counter() - t0
+        for r, res in enumerate(results):
+            if isinstance(res, BaseException):
+                stats.error(f"room {r}", res)
+        if sampler:
+            await sampler.stop()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if analytics_dir is not None:
+            analytics_dir.cleanup()
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "rooms": args.rooms, "players": args.players, "jurors": args.jurors,
+            "questions": args.questions, "think_min_ms": args.think_min,
+            "think_max_ms": args.think_max, "stage_duration": args.stage_duration,
+            "encoding": args.encoding,
+        },
+        "wall_seconds": round(wall, 3),
+        "rooms_completed": sum(1 for r in results if not isinstance(r, BaseException)),
+        "errors": stats.errors,
+        "server_closes": stats.server_closes,
+        "latency": stats.summary(),
+        "server": sampler.summary() if sampler else {"available": False},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Classroom-scale load test for the game server.")
+    parser.add_argument("--rooms", type=int, default=5, help="concurrent rooms")
+    parser.add_argument("--players", type=int, default=20, help="players per room")
+    parser.add_argument("--jurors", type=int, default=3, help="jurors per room")
+    parser.add_argument("--questions", type=int, default=3, help="questions played per room")
+    parser.add_argument("--think-min", type=float, default=50, help="min think time per action (ms)")
+    parser.add_argument("--think-max", type=float, default=500, help="max think time per action (ms)")
+    parser.add_argument("--stage-duration", type=int, default=300,
+                        help="stage timer (s); keep it longer than the think times")
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json",
+                        help="WebSocket wire encoding used by the simulated clients")
+    parser.add_argument("--port", type=int, default=8765, help="port for the locally started server")
+    parser.add_argument("--url", default=None, help="target an already running server instead")
+    parser.add_argument("--server-pid", type=int, default=None, help="pid to sample when using --url")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Load test report written to {args.output}")
+    else:
+        print(text)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Structured, non-blocking logging for the game server.
+
+Records are handed to a QueueHandler on the event loop and formatted/written
+as one JSON object per line by a QueueListener thread, so logging never
+blocks the loop on stdout.
+
+WebSocket traffic goes through `log_ws_message`, which applies a per-message
+type level and sampling rate from the active profile and redacts answer text
+before anything is formatted. Choose the profile with LOG_PROFILE:
+- "production" (default): connection lifecycle and host control messages at
+  INFO, `jury_vote` sampled, per-player `fake`/`choice` only at DEBUG.
+- "debug": every message at INFO, unsampled (answer text is still redacted).
+LOG_LEVEL overrides the root level (default INFO).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+LOGGER_NAME = "fysics"
+
+# message type -> (level, sample rate 0..1); types not listed use the "*" entry
+PROFILES = {
+    "production": {
+        "fake": (logging.DEBUG, 1.0),
+        "choice": (logging.DEBUG, 1.0),
+        "jury_vote": (logging.INFO, 0.25),
+        "*": (logging.INFO, 1.0),
+    },
+    "debug": {
+        "*": (logging.INFO, 1.0),
+    },
+}
+
+# Payload keys that can carry answer text or the correct answer
+REDACTED_KEYS = frozenset({"text", "answer", "answers", "correctAnswer", "question", "fakes"})
+
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_profile = PROFILES["production"]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; anything passed via `extra=` becomes a top-level field."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler whose prepare() keeps the traceback: the stdlib version folds
+    it into the message and drops exc_info. Here the message is merged with its
+    args, the traceback is formatted into exc_text (so no frames travel to the
+    listener thread) and the remaining fields are left for JsonFormatter.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def redact(msg: dict) -> dict:
+    """Copy of a WebSocket payload with answer-bearing fields replaced by their length."""
+    out = {}
+    for key, value in msg.items():
+        if key in REDACTED_KEYS and value is not None:
+            out[key] = f"<redacted len={len(value) if hasattr(value, '__len__') else '?'}>"
+        else:
+            out[key] = value
+    return out
+
+
+def configure_logging(profile: str = None, level: str = None):
+    """Install the queue handler on the root logger and start the writer thread. Safe to call twice."""
+    global _listener, _profile
+    profile = profile or os.getenv("LOG_PROFILE", "production")
+    _profile = PROFILES.get(profile, PROFILES["production"])
+
+    root = logging.getLogger()
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO"))
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+_ws_logger = get_logger("ws")
+
+
+def log_ws_message(room: str, msg: dict):
+    """Log one inbound WebSocket message according to the active profile (cheap no-op when filtered)."""
+    mtype = msg.get("type")
+    level, rate = (isinstance(mtype, str) and _profile.get(mtype)) or _profile["*"]
+    if rate <= 0.0 or not _ws_logger.isEnabledFor(level):
+        return
+    if rate < 1.0 and random.random() >= rate:
+        return
+    _ws_logger.log(level, "ws message", extra={"room": room, "type": mtype, "payload": redact(msg),
+                                                "sampled": rate})
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Log a named lifecycle event with structured fields."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra=fields)
@@ -1,22 +1,39 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header, Depends, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional, Dict
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
 from deck_manager import validate_and_parse_csv
+import deck_import
+import deck_writer
+import analytics
 from generate_game_summary import generate_excel_report
+from leaderboard import Leaderboard
+from event_log import EventLog
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from typing import List, Optional
 import pandas as pd
 from dotenv import load_dotenv
 load_dotenv()
 from host_auth import validate_host_code
-
+import metrics
+import admission
+import sharding
+import protocol
+import spectate
+from log_config import configure_logging, get_logger, log_event, log_ws_message
+
+import logging
 import shutil
 import os
-import uuid
+import random
+import time
+
 
+configure_logging()
+logger = get_logger("server")
 
 app = FastAPI()
 # CORS: allow the Vite dev server (React) to call this API from the browser.
@@ -39,6 +56,20 @@ class CreateDeckRequest(BaseModel):
     name: str  # e.g., "science_quiz.csv"
     questions: List[QuestionModel]
 
+class QuestionUpdate(BaseModel):
+    Question_ID: str
+    # fields left as None are not changed
+    Question_Text: Optional[str] = None
+    Correct_Answer: Optional[str] = None
+    Predefined_Fake: Optional[str] = None
+    Image_Link: Optional[str] = None
+
+class DeckPatchRequest(BaseModel):
+    base_version: int              # "version" from the last GET/PUT/PATCH of this deck
+    update: List[QuestionUpdate] = []
+    add: List[QuestionModel] = []
+    delete: List[str] = []         # Question_IDs
+
 # This makes the images accessible at http://localhost:8000/assets/saturn.jpg
 app.mount("/assets", StaticFiles(directory="assets"), name="assets")
 
@@ -54,6 +85,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_http_latency(request: Request, call_next):
+    """Record request latency per route template (not raw path, to keep label cardinality bounded)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.http_request_seconds.observe(
+            time.perf_counter() - started,
+            request.method, getattr(route, "path", "unmatched"), str(status))
+
 def require_host(x_host_code: str = Header(None, alias="X-Host-Code")):
     """
     Simple API-key gate:
@@ -69,6 +115,11 @@ async def root():
     """Verify the server is alive."""
     return {"message": "Backend API is active"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of in-process metrics."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/host/verify")
 async def host_verify(_ok: bool = Depends(require_host)):
     """
@@ -89,8 +140,9 @@ async def upload_deck(
         if not os.path.exists("decks"): os.makedirs("decks")
         if not os.path.exists("assets"): os.makedirs("assets")
 
-        # 2. Save the CSV
+        # 2. Save the CSV (discarding unsaved editor changes to a deck of the same name)
         csv_path = f"decks/{file.filename}"
+        await deck_writer.forget(file.filename)
         with open(csv_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
 
@@ -112,7 +164,7 @@ async def upload_deck(
         return {"deck_id": file.filename, "questions": result}
 
     except Exception as e:
-        print(f"CRITICAL ERROR: {e}")
+        logger.exception("upload_deck failed")
         return {"error": str(e)}
     
 # Temporary storage for active games
@@ -121,6 +173,22 @@ active_sessions = {}
 # Websocket connections per room code (uppercase)
 session_sockets: Dict[str, List[WebSocket]] = {}
 
+# Inbound message types handled by session_ws (anything else is reported as "other" in metrics)
+WS_MESSAGE_TYPES = frozenset({
+    "question", "cancelled", "fake", "host_next", "choice", "results_request", "jury_phase",
+    "jury_vote", "jury_results", "pause", "resume", "extend_timer", "skip_question",
+    "end_game", "game_finished",
+})
+
+metrics.gauge_callback("fip_active_rooms", "Rooms currently held in memory.",
+                       lambda: len(active_sessions))
+metrics.gauge_callback("fip_active_sockets", "Open WebSocket connections across all rooms.",
+                       lambda: sum(len(s) for s in session_sockets.values()))
+metrics.gauge_callback("fip_active_players", "Players and jurors registered across all rooms.",
+                       lambda: sum(len(s["players"]) + len(s["jurors"]) for s in active_sessions.values()))
+metrics.gauge_callback("fip_active_spectators", "Read-only spectator sockets across all rooms.",
+                       lambda: sum(spectate.watcher_count(code) for code in active_sessions))
+
 class SessionRequest(BaseModel):
     deck_id: str
     enable_worst_fake: bool = False
@@ -133,13 +201,14 @@ async def create_session(request: SessionRequest):
     # Use the deck_id from the request body
     deck_id = request.deck_id
     
-    room_code = str(uuid.uuid4())[:4].upper()
+    room_code = sharding.new_room_code(taken=active_sessions)
     
     host_avatar_url = (request.host_avatar_url or "").strip()
 
     active_sessions[room_code] = {
         "deck_id": deck_id,
         "players": [],
+        "names": set(),          # every registered player/juror name, for O(1) duplicate checks
         "player_avatars": {"Host": host_avatar_url} if host_avatar_url else {},
         "jurors": [],
         "status": "lobby",
@@ -149,8 +218,12 @@ async def create_session(request: SessionRequest):
         "submissions": {},       # questionIndex -> [ {player, text}, ... ]
         "choices": {},           # questionIndex -> { player: answer }
         "scores": {},            # player -> float score
+        "leaderboard": Leaderboard(),  # ranked view of scores, kept in sync by _add_score
+        "event_log": EventLog(),       # sequenced broadcasts for delta replay on reconnect
+        "connect_bucket": admission.room_connect_bucket(),  # rate limit for socket (re)connects
         "jury_votes": {},        # questionIndex -> { juror_name: { best: player_name, worst: player_name|None } }
         "round_breakdown": {},   # questionIndex -> { player: { correct_pts, fool_pts, jury_best_pts, jury_worst_pts } }
+        "questions": {},         # questionIndex -> question dict as sent by the host (for analytics)
         # Timer/stage fields
         "stage1_duration": request.stage1_duration,
         "stage2_duration": request.stage2_duration,
@@ -160,6 +233,9 @@ async def create_session(request: SessionRequest):
         "current_stage": None,            # 1 | 2 | 3 | None
         "stage_status": "idle",           # "running" | "paused" | "ready" | "idle"
         "current_answers_shuffled": [],   # shuffled answer list, stored for reconnect resync
+        "answer_entries": [],             # answer_id -> {text, kind, authors}, aligned with current_answers_shuffled
+        "answer_ids": {},                 # normalized answer text -> answer_id
+        "round_answers": {},              # questionIndex -> that round's answer_entries (for analytics)
         "jury_phase_active": False,        # True while jury is voting (used for reconnect resync)
     }
     
@@ -173,11 +249,17 @@ class JoinRequest(BaseModel):
     avatar_url: Optional[str] = None
 
 @app.post("/join-session")
-async def join_session(request: JoinRequest):
+async def join_session(request: JoinRequest, http_request: Request):
     """
     Allows a player to join a lobby using a 4-character room code.
     """
     code = request.room_code.upper()
+
+    # 0. Rate limit joins per client IP
+    ok, retry_after = admission.allow_ip(http_request.client.host if http_request.client else "unknown")
+    if not ok:
+        raise HTTPException(status_code=429, detail="Too many join attempts. Please retry shortly.",
+                            headers=admission.retry_after_header(retry_after))
     
     # 1. Check if the room exists in our active_sessions dictionary
     if code not in active_sessions:
@@ -188,19 +270,23 @@ async def join_session(request: JoinRequest):
         raise HTTPException(status_code=400, detail="Game already in progress")
 
     # 3. Check for duplicate nickname across players and jurors
-    existing_names = active_sessions[code]["players"] + active_sessions[code]["jurors"]
-    if request.player_name in existing_names:
+    names = active_sessions[code]["names"]
+    if request.player_name in names:
         raise HTTPException(status_code=400, detail="Nickname already taken. Please choose a different name.")
 
     # 4. Add the player to the list
     if request.player_type == "player" or not request.player_type:
         active_sessions[code]["players"].append(request.player_name)
+        names.add(request.player_name)
         avatar_url = (request.avatar_url or "").strip()
         if avatar_url:
             active_sessions[code].setdefault("player_avatars", {})[request.player_name] = avatar_url
     
     elif request.player_type == "juror":
         active_sessions[code]["jurors"].append(request.player_name)
+        names.add(request.player_name)
+    # nothing is broadcast in the lobby, so tell spectators the counts changed
+    spectate.notify(code)
 
     return {
         "message": f"Welcome {request.player_name}!",
@@ -226,7 +312,7 @@ async def get_session_status(room_code: str):
         "jurors": sess["jurors"],
         "scores": sess["scores"],
         "enable_worst_fake": sess.get("enable_worst_fake", False),
-        "scoreboard": list(zip(sess["scores"].keys(), sess["scores"].values())),
+        "scoreboard": sess["leaderboard"].items(),  # ranked, best first
         "submissions": sess.get("submissions", {}),
         "choices": sess.get("choices", {}),
         "round_breakdown": sess.get("round_breakdown", {}),
@@ -235,6 +321,58 @@ async def get_session_status(room_code: str):
         ret["current_index"] = sess["current_index"]
     return ret
 
+# Number of entries pushed in the "leaderboard" WebSocket message after each round
+LEADERBOARD_PUSH_TOP_K = 10
+
+@app.get("/session/{room_code}/leaderboard")
+async def get_leaderboard(room_code: str, top: int = 10, player: Optional[str] = None):
+    """
+    Ranked leaderboard for a room: the top `top` entries and, if `player` is
+    given, that player's rank. Rank movement from the last completed round is
+    included as `round_deltas` (positive = moved up).
+    """
+    code = room_code.upper()
+    if code not in active_sessions:
+        raise HTTPException(status_code=404, detail="Room not found")
+    sess = active_sessions[code]
+    board = sess["leaderboard"]
+    ret = {
+        "room_code": code,
+        "total": len(board),
+        "top": board.top(top),
+        "round_deltas": sess.get("rank_deltas", {}),
+    }
+    if player is not None:
+        ret["player"] = {
+            "player": player,
+            "score": board.score(player),
+            "rank": board.rank(player),
+            "delta": sess.get("rank_deltas", {}).get(player),
+        }
+    return ret
+
+@app.get("/analytics/decks")
+async def analytics_decks(_ok: bool = Depends(require_host)):
+    """Per-deck rollup across all finished games: games played, answer and fool rates."""
+    return {"decks": analytics.deck_summaries()}
+
+@app.get("/analytics/decks/{deck_id}/questions")
+async def analytics_deck_questions(deck_id: str, sort: str = "difficulty", limit: Optional[int] = None,
+                                   min_answers: int = 0, _ok: bool = Depends(require_host)):
+    """
+    Per-question stats for a deck across all finished games.
+    sort: difficulty (lowest correct rate first), fake_effectiveness (Predefined_Fake
+    fool rate), player_fooling or rounds.
+    """
+    if sort not in analytics.SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {sorted(analytics.SORT_KEYS)}")
+    return {"deck_id": deck_id, "questions": analytics.deck_question_stats(deck_id, sort, limit, min_answers)}
+
+@app.get("/analytics/decks/{deck_id}/players")
+async def analytics_deck_players(deck_id: str, limit: int = 10, _ok: bool = Depends(require_host)):
+    """Players who fooled others most on this deck (by display name)."""
+    return {"deck_id": deck_id, "players": analytics.deck_player_stats(deck_id, limit)}
+
 @app.delete("/session/{room_code}")
 async def cancel_session(room_code: str, _ok: bool = Depends(require_host)):
     """
@@ -247,12 +385,7 @@ async def cancel_session(room_code: str, _ok: bool = Depends(require_host)):
     
     active_sessions[code]["status"] = "cancelled"
     # also notify connected websockets
-    if code in session_sockets:
-        for ws in session_sockets[code][:]:
-            try:
-                await ws.send_json({"type": "cancelled"})
-            except Exception:
-                pass
+    await _broadcast(code, {"type": "cancelled"})
     
     return {"message": f"Session {code} has been cancelled"}
 
@@ -260,13 +393,20 @@ async def cancel_session(room_code: str, _ok: bool = Depends(require_host)):
 
 import asyncio
 
-async def _broadcast(code: str, msg: dict):
-    """Send a JSON message to all WebSocket connections in a room.
+async def _broadcast(code: str, msg: dict, exclude: Optional[WebSocket] = None):
+    """Send a message to all WebSocket connections in a room (except `exclude`).
+    The message is stamped with the room's next seq and kept for reconnect replay.
     Removes any connections that fail to receive the message."""
+    started = time.perf_counter()
+    sess = active_sessions.get(code)
+    if sess is not None:
+        msg = sess["event_log"].stamp(msg)
+    targets = [ws for ws in session_sockets.get(code, []) if ws is not exclude]
+    frames = {}  # encode once per codec, not once per socket
     dead = []
-    for ws in session_sockets.get(code, [])[:]:
+    for ws in targets:
         try:
-            await ws.send_json(msg)
+            await protocol.send_encoded(ws, msg, frames)
         except Exception:
             dead.append(ws)
     for ws in dead:
@@ -274,6 +414,67 @@ async def _broadcast(code: str, msg: dict):
             session_sockets[code].remove(ws)
         except ValueError:
             pass
+    metrics.broadcast_seconds.observe(time.perf_counter() - started, msg.get("type", ""))
+    metrics.broadcast_fanout.observe(len(targets))
+    if dead:
+        metrics.dead_sockets.inc(len(dead))
+    spectate.notify(code)  # spectators get a coalesced state frame, not every message
+
+def _add_score(sess: dict, player: str, points: float):
+    """Apply a score change to both the scores dict and the ranked leaderboard."""
+    sess["scores"][player] = sess["leaderboard"].add(player, points)
+
+def _normalize_answer(text) -> str:
+    return str(text or "").strip().lower()
+
+def _build_answer_set(sess: dict, subs: List[dict]) -> List[str]:
+    """
+    Build the shuffled stage 2 answer list. Answers that are equal once
+    normalized are merged into one entry (a fake identical to the correct
+    answer just shows the correct answer). An answer's id is its position in
+    the list; the session keeps the entries and a text -> id index.
+    """
+    q = sess.get("current_question", {})
+    entries = {}  # normalized text -> {text, kind, authors}
+
+    def add(text, kind, author=None):
+        key = _normalize_answer(text)
+        if not key:
+            return
+        entry = entries.setdefault(key, {"text": text, "kind": kind, "authors": []})
+        if author:
+            entry["authors"].append(author)
+
+    add(q.get("Correct_Answer") or sess.get("current_correct_answer"), "correct")
+    add(q.get("Predefined_Fake"), "predefined")
+    for e in subs:
+        t = e.get("text", "")
+        if t and t != "No submission":
+            add(t, "player", e.get("player"))
+    answer_entries = list(entries.values())
+    random.shuffle(answer_entries)
+    sess["answer_entries"] = answer_entries
+    sess.setdefault("round_answers", {})[sess.get("current_index")] = answer_entries
+    sess["answer_ids"] = {_normalize_answer(e["text"]): i for i, e in enumerate(answer_entries)}
+    sess["current_answers_shuffled"] = [e["text"] for e in answer_entries]
+    return sess["current_answers_shuffled"]
+
+def _resolve_answer_id(sess: dict, msg: dict) -> Optional[int]:
+    """answer_id of a choice message; older clients that send the answer text are looked up by it."""
+    answer_id = msg.get("answer_id")
+    if type(answer_id) is int and 0 <= answer_id < len(sess.get("answer_entries", [])):
+        return answer_id
+    if isinstance(msg.get("answer"), str):
+        return sess.get("answer_ids", {}).get(_normalize_answer(msg["answer"]))
+    return None
+
+async def _record_analytics(code: str):
+    """Fold a finished game into the cross-game analytics and persist them off the loop."""
+    if analytics.record_game(active_sessions[code]):
+        try:
+            await asyncio.to_thread(analytics.write, analytics.snapshot())
+        except OSError:
+            logger.exception("failed to save analytics")
 
 async def _cancel_timer(code: str):
     """Cancel the running timer task for a room, if any."""
@@ -335,7 +536,9 @@ async def _run_stage_timer(code: str, stage: int, duration: int):
                 "paused": sess["timer_paused"],
                 "status": sess["stage_status"],
             })
+            tick_started = time.perf_counter()
             await asyncio.sleep(1)
+            metrics.timer_drift_seconds.observe(max(0.0, time.perf_counter() - tick_started - 1))
             if not sess["timer_paused"]:
                 sess["timer_remaining"] -= 1
             if sess.get("stage_status") == "ready":
@@ -354,414 +557,515 @@ async def _start_stage(code: str, stage: int):
     sess["timer_task"] = asyncio.create_task(_run_stage_timer(code, stage, duration))
 
 
+def _timer_message(sess: dict) -> Optional[dict]:
+    """Current timer state as a timer_update message, or None if no stage is active."""
+    if sess.get("current_stage") is None:
+        return None
+    return {
+        "type": "timer_update",
+        "stage": sess["current_stage"],
+        "remaining": sess["timer_remaining"],
+        "paused": sess["timer_paused"],
+        "status": sess["stage_status"],
+    }
+
+def _resync_messages(sess: dict) -> List[dict]:
+    """Messages that bring a (re)connecting client up to the current game state."""
+    out = []
+    idx = sess.get("current_index")
+    if idx is None:
+        return out
+    # 1. current question
+    payload = {"type": "question", "index": idx}
+    if "current_question" in sess:
+        payload["question"] = sess["current_question"]
+    out.append(payload)
+    # 2. timer state if a stage is active
+    timer = _timer_message(sess)
+    if timer:
+        out.append(timer)
+    # 3. if Stage 2 is active, the shuffled answers so the player can choose
+    if sess.get("current_stage") == 2 and sess.get("current_answers_shuffled"):
+        out.append({"type": "answers", "answers": sess["current_answers_shuffled"]})
+    # 4. if READY state, stage_ready so clients show the correct banner
+    if sess.get("stage_status") == "ready":
+        out.append({"type": "stage_ready", "stage": sess.get("current_stage"), "reason": "reconnect"})
+    # 5. if jury phase is active, jury_phase so reconnecting jurors can vote
+    if sess.get("jury_phase_active") and sess.get("jury_phase_payload"):
+        out.append(sess["jury_phase_payload"])
+    return out
+
+def _spectator_state(code: str) -> Optional[dict]:
+    """
+    Public room state for spectators: the shuffled choices once voting starts
+    (as players see them), but which one is correct only after the round's scores.
+    """
+    sess = active_sessions.get(code)
+    if sess is None:
+        return None
+    idx = sess.get("current_index")
+    state = {
+        "type": "spectator_state",
+        "room_code": code,
+        "status": sess["status"],
+        "players": len(sess["players"]),
+        "jurors": len(sess["jurors"]),
+        "top": sess["leaderboard"].top(LEADERBOARD_PUSH_TOP_K),
+        "total": len(sess["leaderboard"]),
+    }
+    if idx is not None:
+        q = sess.get("current_question") or {}
+        state["index"] = idx
+        state["question"] = {"Question_Text": q.get("Question_Text", ""), "Image_Link": q.get("Image_Link")}
+        state["timer"] = _timer_message(sess)
+        state["submitted"] = len(sess.get("submissions", {}).get(idx, []))
+        state["chosen"] = len(sess.get("choices", {}).get(idx, []))
+        if sess.get("current_stage") == 2 or idx in sess.get("round_breakdown", {}):
+            state["answers"] = sess.get("current_answers_shuffled", [])
+        if sess.get("jury_phase_active"):
+            state["count"] = len(sess.get("jury_votes", {}).get(idx, {}))
+        if idx in sess.get("round_breakdown", {}):
+            state["correct_answer"] = sess.get("current_correct_answer", "")
+    return state
+
+@app.websocket("/ws/spectate/{room_code}")
+async def spectate_ws(websocket: WebSocket, room_code: str):
+    """
+    Read-only view of a room for projectors and audiences. Sends a
+    "spectator_state" frame on connect and then at most every
+    spectate.SPECTATOR_INTERVAL seconds while the game changes.
+    Not a player/juror and not part of session_sockets; inbound messages are ignored.
+    """
+    codec, subprotocol = protocol.negotiate(websocket)
+    websocket.state.codec = codec
+    await websocket.accept(subprotocol=subprotocol)
+    code = room_code.upper()
+    if code not in active_sessions:
+        metrics.ws_connections.inc(1, "rejected")
+        await websocket.close(code=1008)
+        return
+    ok, retry_after = admission.allow_spectator_ip(websocket.client.host if websocket.client else "unknown")
+    if not ok:
+        metrics.ws_connections.inc(1, "throttled")
+        await websocket.close(code=admission.CLOSE_TRY_AGAIN_LATER, reason=admission.close_reason(retry_after))
+        return
+    metrics.ws_connections.inc(1, "spectator")
+    log_event(logger, "spectator_connected", logging.DEBUG, room=code, watchers=spectate.watcher_count(code) + 1)
+    await spectate.watch(websocket, code, lambda: _spectator_state(code))
+
 @app.websocket("/ws/session/{room_code}")
 async def session_ws(websocket: WebSocket, room_code: str):
-    # debug info for every handshake attempt
-    print(f"WebSocket connect attempt room={room_code}, origin={websocket.headers.get('origin')}")
-    # Upgrade connection
-    await websocket.accept()
-    print(f"WebSocket accepted for room={room_code}")
+    # Upgrade connection, negotiating JSON (default) or MessagePack frames
+    codec, subprotocol = protocol.negotiate(websocket)
+    websocket.state.codec = codec
+    await websocket.accept(subprotocol=subprotocol)
+    log_event(logger, "ws_accepted", room=room_code, origin=websocket.headers.get("origin"),
+              encoding=codec.name)
 
     code = room_code.upper()
     # reject if session doesn't exist
     if code not in active_sessions:
-        print(f"WebSocket rejected: room {code} not found")
+        log_event(logger, "ws_rejected", logging.WARNING, room=code, reason="room_not_found")
+        metrics.ws_connections.inc(1, "rejected")
         await websocket.close(code=1008)
         return
 
+    # admission: per-IP and per-room connect rate, and a cap on sockets per room
+    ok, retry_after = admission.admit_socket(
+        websocket.client.host if websocket.client else "unknown",
+        active_sessions[code]["connect_bucket"],
+        len(session_sockets.get(code, [])),
+    )
+    if not ok:
+        log_event(logger, "ws_rejected", logging.WARNING, room=code, reason="admission",
+                  retry_after=round(retry_after, 2))
+        metrics.ws_connections.inc(1, "throttled")
+        await websocket.close(code=admission.CLOSE_TRY_AGAIN_LATER, reason=admission.close_reason(retry_after))
+        return
+
     # register
     session_sockets.setdefault(code, []).append(websocket)
-    print(f"Registered socket for {code}; total connections={len(session_sockets[code])}")
+    metrics.ws_connections.inc(1, "accepted")
+    log_event(logger, "ws_registered", room=code, connections=len(session_sockets[code]))
 
     # resync a reconnecting client to current game state
     sess = active_sessions.get(code)
-    if sess:
-        idx = sess.get("current_index")
-        if idx is not None:
-            # 1. resend current question
-            payload = {"type": "question", "index": idx}
-            if "current_question" in sess:
-                payload["question"] = sess["current_question"]
-            await websocket.send_json(payload)
-            print(f"Sent initial question payload to new client for room={code}")
-            # 2. resend timer state if a stage is active
-            if sess.get("current_stage") is not None:
-                await websocket.send_json({
-                    "type": "timer_update",
-                    "stage": sess["current_stage"],
-                    "remaining": sess["timer_remaining"],
-                    "paused": sess["timer_paused"],
-                    "status": sess["stage_status"],
-                })
-            # 3. if Stage 2 is active, resend the shuffled answers so the player can choose
-            if sess.get("current_stage") == 2 and sess.get("current_answers_shuffled"):
-                await websocket.send_json({"type": "answers", "answers": sess["current_answers_shuffled"]})
-            # 4. if READY state, resend stage_ready so clients show the correct banner
-            if sess.get("stage_status") == "ready":
-                await websocket.send_json({
-                    "type": "stage_ready",
-                    "stage": sess.get("current_stage"),
-                    "reason": "reconnect",
-                })
-            # 5. if jury phase is active, resend jury_phase so reconnecting jurors can vote
-            if sess.get("jury_phase_active") and sess.get("jury_phase_payload"):
-                await websocket.send_json(sess["jury_phase_payload"])
-
+    last_seq = websocket.query_params.get("last_seq")
+    if sess and last_seq is not None and last_seq.lstrip("-").isdigit():
+        # client tracks seq: send only what it missed, or one snapshot if too far behind
+        missed = sess["event_log"].since(int(last_seq))
+        if missed is None:
+            await protocol.send(websocket, {"type": "snapshot", "seq": sess["event_log"].seq,
+                                            "messages": _resync_messages(sess)})
+            log_event(logger, "ws_resync", logging.DEBUG, room=code, mode="snapshot")
+        else:
+            timer = _timer_message(sess)
+            if missed or timer:
+                await protocol.send(websocket, {"type": "replay", "messages": missed + ([timer] if timer else [])})
+            log_event(logger, "ws_resync", logging.DEBUG, room=code, mode="replay", missed=len(missed))
+    elif sess:
+        # legacy client: resend current state as separate messages
+        for payload in _resync_messages(sess):
+            await protocol.send(websocket, payload)
+        if sess.get("current_index") is not None:
+            log_event(logger, "ws_resync", logging.DEBUG, room=code, index=sess["current_index"])
+
+    msg_bucket = admission.socket_message_bucket()
+    throttle_notified = False
     try:
         while True:
-            msg = await websocket.receive_json()
-            print(f"Received ws msg for room={code}: {msg}")
-            # expected format: {type:'question', index:..., question: {...}}
-            if msg.get("type") == "question":
-                # update session data
-                active_sessions[code]["status"] = "in-progress"
-                active_sessions[code]["current_index"] = msg.get("index")
-                active_sessions[code]["current_question"] = msg.get("question")
-                active_sessions[code]["current_correct_answer"] = msg.get("correctAnswer")
-                # reset timer/stage state for the new question
-                await _cancel_timer(code)
-                active_sessions[code]["stage_status"] = "idle"
-                active_sessions[code]["current_answers_shuffled"] = []
-                # broadcast to all peers except sender
-                dead = []
-                for ws in session_sockets.get(code, [])[:]:
-                    if ws is websocket:
-                        continue
-                    try:
-                        await ws.send_json(msg)
-                    except Exception:
-                        dead.append(ws)
-                for ws in dead:
-                    try:
-                        session_sockets[code].remove(ws)
-                    except ValueError:
-                        pass
-                # start Stage 1 timer
-                await _start_stage(code, 1)
-            elif msg.get("type") == "cancelled": # host is cancelling the game
-                for ws in session_sockets.get(code, [])[:]: # broadcast to all peers except sender
-                    if ws is websocket: 
-                        continue
-                    try:
-                        await ws.send_json({"type":"cancelled"}) # notify clients to exit
-                    except Exception:
-                        pass
-            elif msg.get("type") == "fake":
-                # a player submitted a fake answer
-                sess = active_sessions[code]
-                # reject if Stage 1 is not actively running (paused, ready, or wrong stage)
-                if sess.get("stage_status") != "running" or sess.get("current_stage") != 1:
-                    try:
-                        await websocket.send_json({"type": "timer_error", "message": "Submission not accepted: stage has ended or is paused."})
-                    except Exception:
-                        pass
-                    continue
-                player = msg.get("player")
-                text = msg.get("text")
-                idx = sess.get("current_index")
-                # overwrite existing submission for this player rather than appending
-                subs = sess.setdefault("submissions", {}).setdefault(idx, [])
-                existing = next((e for e in subs if e["player"] == player), None)
-                if existing:
-                    existing["text"] = text
-                else:
-                    subs.append({"player": player, "text": text})
-                # broadcast to host (and others) that a submission arrived
-                for ws in session_sockets.get(code, [])[:]:
-                    if ws is websocket:
-                        continue
-                    try:
-                        await ws.send_json({"type": "submission", "player": player})
-                    except Exception:
-                        pass
-                # check if all players have submitted — end stage early if so
-                submitted_players = {e["player"] for e in subs}
-                all_players = set(sess.get("players", []))
-                if all_players and submitted_players >= all_players:
-                    await _end_stage(code, 1, "all_submitted")
-                    await _cancel_timer(code)
-            elif msg.get("type") == "host_next":
-                # host clicked "Next" after a READY state — advance to the next stage
-                sess = active_sessions[code]
-                from_stage = msg.get("stage")
-                if from_stage == 1:
-                    # Stage 1 READY -> Stage 2: build shuffled answer list and start Stage 2 timer
-                    idx = sess.get("current_index")
-                    subs = sess.setdefault("submissions", {}).setdefault(idx, [])
-                    # Fill "No submission" for players who haven't submitted (supports Skip Phase before READY)
-                    submitted_players = {e["player"] for e in subs}
-                    for p in sess.get("players", []):
-                        if p not in submitted_players:
-                            subs.append({"player": p, "text": "No submission"})
-                    q = sess.get("current_question", {})
-                    answers_list = []
-                    if q.get("Correct_Answer"):
-                        answers_list.append(q["Correct_Answer"])
-                    if q.get("Predefined_Fake"):
-                        answers_list.append(q["Predefined_Fake"])
-                    for entry in subs:
-                        t = entry.get("text", "")
-                        if t and t != "No submission":
-                            answers_list.append(t)
-                    import random
-                    random.shuffle(answers_list)
-                    sess["current_answers_shuffled"] = answers_list
-                    await _broadcast(code, {"type": "answers", "answers": answers_list})
-                    await _broadcast(code, {"type": "stage_transition", "from_stage": 1, "to_stage": 2})
-                    await _start_stage(code, 2)
-                elif from_stage == 2:
-                    # Stage 2 READY -> Stage 3 (results/jury, untimed): cancel timer + clear ready state
-                    await _cancel_timer(code)
-                    sess["stage_status"] = "idle"
-                    await _broadcast(code, {"type": "stage_transition", "from_stage": 2, "to_stage": 3})
-        
-            elif msg.get("type") == "choice":
-                # player chose an answer during answer phase
-                sess = active_sessions[code]
-                # reject if Stage 2 is not actively running
-                if sess.get("stage_status") != "running" or sess.get("current_stage") != 2:
-                    try:
-                        await websocket.send_json({"type": "timer_error", "message": "Choice not accepted: stage has ended or is paused."})
-                    except Exception:
-                        pass
-                    continue
-                player = msg.get("player")
-                choice = msg.get("answer")
-                idx = sess.get("current_index")
-                correct = sess.get("current_correct_answer", "")
-                if choice and correct and choice.strip().lower() == correct.strip().lower():
-                    # correct answer chosen — +1 to this player
-                    sess["scores"][player] = sess["scores"].get(player, 0) + 1
-                elif choice:
-                    # wrong answer — find which player submitted this as their fake and give them +1
-                    subs = sess.get("submissions", {}).get(idx, [])
-                    for entry in subs:
-                        if entry.get("text", "").strip().lower() == choice.strip().lower():
-                            author = entry.get("player")
-                            if author and author != player:
-                                sess["scores"][author] = sess["scores"].get(author, 0) + 1
-                            break
-                # record the choice for stats
-                choices = sess.setdefault("choices", {})
-                choices.setdefault(idx, []).append({"player": player, "text": choice})
-                # check if all players have chosen — end stage early if so
-                chose_players = {e["player"] for e in choices.get(idx, [])}
-                all_players = set(sess.get("players", []))
-                if all_players and chose_players >= all_players:
-                    await _end_stage(code, 2, "all_submitted")
+            msg = await protocol.receive(websocket)
+            # per-socket inbound rate limit: drop the message, tell the client once per episode
+            ok, retry_after = msg_bucket.take()
+            if not ok:
+                metrics.admission_rejected.inc(1, "socket")
+                if not throttle_notified:
+                    throttle_notified = True
+                    await protocol.send(websocket, {"type": "rate_limited", "retry_after": round(retry_after, 2)})
+                continue
+            throttle_notified = False
+            if msg is None or not isinstance(msg.get("type", ""), str):
+                # undecodable frame or a non-string type; it still counted against the rate limit
+                if msg is not None:
+                    metrics.ws_messages_dropped.inc(1, protocol.codec_of(websocket).name)
+                continue
+            started = time.perf_counter()
+            log_ws_message(code, msg)
+            try:
+                # expected format: {type:'question', index:..., question: {...}}
+                if msg.get("type") == "question":
+                    # update session data
+                    active_sessions[code]["status"] = "in-progress"
+                    active_sessions[code]["current_index"] = msg.get("index")
+                    active_sessions[code]["current_question"] = msg.get("question")
+                    active_sessions[code]["questions"][msg.get("index")] = msg.get("question") or {}
+                    active_sessions[code]["current_correct_answer"] = msg.get("correctAnswer")
+                    # reset timer/stage state for the new question
                     await _cancel_timer(code)
-            elif msg.get("type") == "results_request":
-                # host wants to see results for current question
-                idx = active_sessions[code].get("current_index")
-                correct = active_sessions[code].get("current_correct_answer")
-                # attempt to read correct from stored question object if saved
-                # but simpler: host will resend correct as part of message
-                # server can compute stats based on stored choices
-                stats = {}
-                choices = active_sessions[code].get("choices", {}).get(idx, {})
-                for choice in choices:     
-                    stats[choice["text"]] = stats.get(choice["text"], 0) + 1
-                # broadcast results
-                for ws in session_sockets.get(code, [])[:]:
-                    if ws is websocket:
+                    active_sessions[code]["stage_status"] = "idle"
+                    active_sessions[code]["current_answers_shuffled"] = []
+                    active_sessions[code]["answer_entries"] = []
+                    active_sessions[code]["answer_ids"] = {}
+                    # broadcast to all peers except sender
+                    await _broadcast(code, msg, exclude=websocket)
+                    # start Stage 1 timer
+                    await _start_stage(code, 1)
+                elif msg.get("type") == "cancelled": # host is cancelling the game
+                    # notify all peers except sender so clients exit
+                    await _broadcast(code, {"type": "cancelled"}, exclude=websocket)
+                elif msg.get("type") == "fake":
+                    # a player submitted a fake answer
+                    sess = active_sessions[code]
+                    # reject if Stage 1 is not actively running (paused, ready, or wrong stage)
+                    if sess.get("stage_status") != "running" or sess.get("current_stage") != 1:
                         try:
-                            await ws.send_json({"type": "results", "stats": stats})
+                            await protocol.send(websocket, {"type": "timer_error", "message": "Submission not accepted: stage has ended or is paused."})
                         except Exception:
                             pass
+                        continue
+                    player = msg.get("player")
+                    text = msg.get("text")
+                    idx = sess.get("current_index")
+                    # overwrite existing submission for this player rather than appending
+                    subs = sess.setdefault("submissions", {}).setdefault(idx, [])
+                    existing = next((e for e in subs if e["player"] == player), None)
+                    if existing:
+                        existing["text"] = text
                     else:
-                        #the players should get whether they were correct or not, so include the correct answer in the payload for them but not for the host since they already know it
+                        subs.append({"player": player, "text": text})
+                    # broadcast to host (and others) that a submission arrived
+                    await _broadcast(code, {"type": "submission", "player": player}, exclude=websocket)
+                    # check if all players have submitted — end stage early if so
+                    submitted_players = {e["player"] for e in subs}
+                    all_players = set(sess.get("players", []))
+                    if all_players and submitted_players >= all_players:
+                        await _end_stage(code, 1, "all_submitted")
+                        await _cancel_timer(code)
+                elif msg.get("type") == "host_next":
+                    # host clicked "Next" after a READY state — advance to the next stage
+                    sess = active_sessions[code]
+                    from_stage = msg.get("stage")
+                    if from_stage == 1:
+                        # Stage 1 READY -> Stage 2: build shuffled answer list and start Stage 2 timer
+                        idx = sess.get("current_index")
+                        subs = sess.setdefault("submissions", {}).setdefault(idx, [])
+                        # Fill "No submission" for players who haven't submitted (supports Skip Phase before READY)
+                        submitted_players = {e["player"] for e in subs}
+                        for p in sess.get("players", []):
+                            if p not in submitted_players:
+                                subs.append({"player": p, "text": "No submission"})
+                        answers_list = _build_answer_set(sess, subs)
+                        await _broadcast(code, {"type": "answers", "answers": answers_list})
+                        await _broadcast(code, {"type": "stage_transition", "from_stage": 1, "to_stage": 2})
+                        await _start_stage(code, 2)
+                    elif from_stage == 2:
+                        # Stage 2 READY -> Stage 3 (results/jury, untimed): cancel timer + clear ready state
+                        await _cancel_timer(code)
+                        sess["stage_status"] = "idle"
+                        await _broadcast(code, {"type": "stage_transition", "from_stage": 2, "to_stage": 3})
+        
+                elif msg.get("type") == "choice":
+                    # player chose an answer during answer phase
+                    sess = active_sessions[code]
+                    # reject if Stage 2 is not actively running
+                    if sess.get("stage_status") != "running" or sess.get("current_stage") != 2:
                         try:
-                            await ws.send_json({"type": "results", "correct": correct})
+                            await protocol.send(websocket, {"type": "timer_error", "message": "Choice not accepted: stage has ended or is paused."})
                         except Exception:
                             pass
-            elif msg.get("type") == "jury_phase":
-                # host starts jury voting phase — compile player fakes and broadcast to all (jurors will handle it)
-                idx = active_sessions[code].get("current_index")
-                subs = active_sessions[code].get("submissions", {}).get(idx, [])
-                fakes = [{"player": e["player"], "text": e["text"]} for e in subs if e.get("player") and e.get("text") != "No submission"] # only include real submissions, not the "No submission" placeholders
-                fakes.append({"player": "Host", "text": active_sessions[code].get("current_question", {}).get("Predefined_Fake", "")})
-                enable_worst_fake = active_sessions[code].get("enable_worst_fake", False)
-                total_jurors = len(active_sessions[code].get("jurors", []))
-                payload = {"type": "jury_phase", "fakes": fakes, "enable_worst_fake": enable_worst_fake}
-                active_sessions[code]["jury_phase_active"] = True
-                active_sessions[code]["jury_phase_payload"] = payload  # cache for reconnect resync
-                await _broadcast(code, payload)
-                # Broadcast initial jury vote progress (0/N) so host displays total jurors immediately
-                await _broadcast(code, {"type": "jury_vote_count", "count": 0, "total_jurors": total_jurors})
-            elif msg.get("type") == "jury_vote":
-                # a juror submitted their vote
-                idx = active_sessions[code].get("current_index")
-                juror_name = msg.get("juror_name", "").strip()
-                best = msg.get("best_fake_player")
-                worst = msg.get("worst_fake_player")
-                if juror_name:
-                    jury_votes = active_sessions[code].setdefault("jury_votes", {})
-                    jury_votes.setdefault(idx, {})[juror_name] = {"best": best, "worst": worst}
-                    # broadcast vote count to all (host uses it to track progress)
-                    total_jurors = len(active_sessions[code].get("jurors", []))
-                    vote_count = len(jury_votes.get(idx, {}))
+                        continue
+                    player = msg.get("player")
+                    choice = msg.get("answer")
+                    idx = sess.get("current_index")
+                    answer_id = _resolve_answer_id(sess, msg)
+                    if answer_id is not None:
+                        entry = sess["answer_entries"][answer_id]
+                        choice = entry["text"]
+                        if entry["kind"] == "correct":
+                            # correct answer chosen — +1 to this player
+                            _add_score(sess, player, 1)
+                        else:
+                            # wrong answer — +1 to every player who wrote this fake
+                            for author in entry["authors"]:
+                                if author != player:
+                                    _add_score(sess, author, 1)
+                    # record the choice for stats
+                    choices = sess.setdefault("choices", {})
+                    choices.setdefault(idx, []).append({"player": player, "text": choice, "answer_id": answer_id})
+                    spectate.notify(code)  # choices and scores change without a broadcast
+                    # check if all players have chosen — end stage early if so
+                    chose_players = {e["player"] for e in choices.get(idx, [])}
+                    all_players = set(sess.get("players", []))
+                    if all_players and chose_players >= all_players:
+                        await _end_stage(code, 2, "all_submitted")
+                        await _cancel_timer(code)
+                elif msg.get("type") == "results_request":
+                    # host wants to see results for current question
+                    idx = active_sessions[code].get("current_index")
+                    correct = active_sessions[code].get("current_correct_answer")
+                    # attempt to read correct from stored question object if saved
+                    # but simpler: host will resend correct as part of message
+                    # server can compute stats based on stored choices
+                    stats = {}
+                    choices = active_sessions[code].get("choices", {}).get(idx, {})
+                    for choice in choices:     
+                        stats[choice["text"]] = stats.get(choice["text"], 0) + 1
+                    # broadcast results
                     for ws in session_sockets.get(code, [])[:]:
-                        try:
-                            await ws.send_json({"type": "jury_vote_count", "count": vote_count, "total_jurors": total_jurors})
-                        except Exception:
-                            pass
-            elif msg.get("type") == "jury_results":
-                # host requests jury scoring — compute fractional points and broadcast round_scores
-                idx = active_sessions[code].get("current_index")
-                jurors_registered = active_sessions[code].get("jurors", [])
-                total_jurors = len(jurors_registered) or 1  # avoid divide-by-zero
-                jury_votes_for_q = active_sessions[code].get("jury_votes", {}).get(idx, {})
-                enable_worst_fake = active_sessions[code].get("enable_worst_fake", False)
-
-                # tally jury votes
-                best_tally = {}   # player -> count of best votes
-                worst_tally = {}  # player -> count of worst votes
-                for vote in jury_votes_for_q.values():
-                    b = vote.get("best")
-                    w = vote.get("worst")
-                    if b:
-                        best_tally[b] = best_tally.get(b, 0) + 1
-                    if w and enable_worst_fake:
-                        worst_tally[w] = worst_tally.get(w, 0) + 1
-
-                # apply fractional jury scores
-                for player, count in best_tally.items():
-                    pts = count / total_jurors
-                    active_sessions[code]["scores"][player] = active_sessions[code]["scores"].get(player, 0) + pts
-                for player, count in worst_tally.items():
-                    pts = count / total_jurors
-                    active_sessions[code]["scores"][player] = active_sessions[code]["scores"].get(player, 0) - pts
-
-                # build per-player round breakdown
-                correct = active_sessions[code].get("current_correct_answer", "")
-                choices_for_q = active_sessions[code].get("choices", {}).get(idx, [])
-                subs_for_q = active_sessions[code].get("submissions", {}).get(idx, [])
-
-                all_players = set(active_sessions[code].get("players", []))
-                breakdown = {}
-                for p in all_players:
-                    # correct pts: did this player guess correctly?
-                    correct_pts = 0
+                        if ws is websocket:
+                            try:
+                                await protocol.send(ws, {"type": "results", "stats": stats})
+                            except Exception:
+                                pass
+                        else:
+                            #the players should get whether they were correct or not, so include the correct answer in the payload for them but not for the host since they already know it
+                            try:
+                                await protocol.send(ws, {"type": "results", "correct": correct})
+                            except Exception:
+                                pass
+                elif msg.get("type") == "jury_phase":
+                    # host starts jury voting phase — compile player fakes and broadcast to all (jurors will handle it)
+                    idx = active_sessions[code].get("current_index")
+                    subs = active_sessions[code].get("submissions", {}).get(idx, [])
+                    fakes = [{"player": e["player"], "text": e["text"]} for e in subs if e.get("player") and e.get("text") != "No submission"] # only include real submissions, not the "No submission" placeholders
+                    fakes.append({"player": "Host", "text": active_sessions[code].get("current_question", {}).get("Predefined_Fake", "")})
+                    enable_worst_fake = active_sessions[code].get("enable_worst_fake", False)
+                    total_jurors = len(active_sessions[code].get("jurors", []))
+                    payload = {"type": "jury_phase", "fakes": fakes, "enable_worst_fake": enable_worst_fake}
+                    active_sessions[code]["jury_phase_active"] = True
+                    active_sessions[code]["jury_phase_payload"] = payload  # cache for reconnect resync
+                    await _broadcast(code, payload)
+                    # Broadcast initial jury vote progress (0/N) so host displays total jurors immediately
+                    await _broadcast(code, {"type": "jury_vote_count", "count": 0, "total_jurors": total_jurors})
+                elif msg.get("type") == "jury_vote":
+                    # a juror submitted their vote
+                    idx = active_sessions[code].get("current_index")
+                    juror_name = msg.get("juror_name", "").strip()
+                    best = msg.get("best_fake_player")
+                    worst = msg.get("worst_fake_player")
+                    if juror_name:
+                        jury_votes = active_sessions[code].setdefault("jury_votes", {})
+                        jury_votes.setdefault(idx, {})[juror_name] = {"best": best, "worst": worst}
+                        # broadcast vote count to all (host uses it to track progress)
+                        total_jurors = len(active_sessions[code].get("jurors", []))
+                        vote_count = len(jury_votes.get(idx, {}))
+                        await _broadcast(code, {"type": "jury_vote_count", "count": vote_count, "total_jurors": total_jurors})
+                elif msg.get("type") == "jury_results":
+                    # host requests jury scoring — compute fractional points and broadcast round_scores
+                    idx = active_sessions[code].get("current_index")
+                    jurors_registered = active_sessions[code].get("jurors", [])
+                    total_jurors = len(jurors_registered) or 1  # avoid divide-by-zero
+                    jury_votes_for_q = active_sessions[code].get("jury_votes", {}).get(idx, {})
+                    enable_worst_fake = active_sessions[code].get("enable_worst_fake", False)
+
+                    # tally jury votes
+                    best_tally = {}   # player -> count of best votes
+                    worst_tally = {}  # player -> count of worst votes
+                    for vote in jury_votes_for_q.values():
+                        b = vote.get("best")
+                        w = vote.get("worst")
+                        if b:
+                            best_tally[b] = best_tally.get(b, 0) + 1
+                        if w and enable_worst_fake:
+                            worst_tally[w] = worst_tally.get(w, 0) + 1
+
+                    # apply fractional jury scores
+                    for player, count in best_tally.items():
+                        pts = count / total_jurors
+                        _add_score(active_sessions[code], player, pts)
+                    for player, count in worst_tally.items():
+                        pts = count / total_jurors
+                        _add_score(active_sessions[code], player, -pts)
+
+                    # build per-player round breakdown
+                    correct = active_sessions[code].get("current_correct_answer", "")
+                    choices_for_q = active_sessions[code].get("choices", {}).get(idx, [])
+
+                    all_players = set(active_sessions[code].get("players", []))
+                    entries = active_sessions[code].get("answer_entries", [])
+                    # one pass over the choices: picks per answer_id, and who picked the correct answer
+                    picks = {}
+                    own_picks = {}  # (player, answer_id) -> count, so nobody fools themselves
+                    correct_players = set()
                     for c in choices_for_q:
-                        if c.get("player") == p and correct and c.get("text", "").strip().lower() == correct.strip().lower():
-                            correct_pts = 1
-                            break
-
-                    # fool pts: how many players chose this player's fake?
-                    fool_pts = 0
-                    p_fake_text = None
-                    for s in subs_for_q:
-                        if s.get("player") == p:
-                            p_fake_text = s.get("text", "").strip().lower()
-                            break
-                    if p_fake_text:
-                        for c in choices_for_q:
-                            if c.get("text", "").strip().lower() == p_fake_text and c.get("player") != p:
-                                fool_pts += 1
-
-                    jury_best_pts = round(best_tally.get(p, 0) / total_jurors, 4)
-                    jury_worst_pts = round(worst_tally.get(p, 0) / total_jurors, 4) if enable_worst_fake else 0
-                    round_total = round(correct_pts + fool_pts + jury_best_pts - jury_worst_pts, 4)
-                    breakdown[p] = {
-                        "correct_pts": correct_pts,
-                        "fool_pts": fool_pts,
-                        "jury_best_pts": jury_best_pts,
-                        "jury_worst_pts": jury_worst_pts,
-                        "round_total": round_total,
-                    }
-
-                # Include "Predefined Fake" in breakdown if it received any jury votes
-                pf_key = "Host"
-                if pf_key in best_tally or pf_key in worst_tally:
-                    pf_jury_best = round(best_tally.get(pf_key, 0) / total_jurors, 4)
-                    pf_jury_worst = round(worst_tally.get(pf_key, 0) / total_jurors, 4) if enable_worst_fake else 0
-                    breakdown[pf_key] = {
-                        "correct_pts": 0,
-                        "fool_pts": 0,
-                        "jury_best_pts": pf_jury_best,
-                        "jury_worst_pts": pf_jury_worst,
-                        "round_total": round(pf_jury_best - pf_jury_worst, 4),
+                        aid = c.get("answer_id")
+                        if aid is None or aid >= len(entries):
+                            continue
+                        picks[aid] = picks.get(aid, 0) + 1
+                        own_picks[(c.get("player"), aid)] = own_picks.get((c.get("player"), aid), 0) + 1
+                        if entries[aid]["kind"] == "correct":
+                            correct_players.add(c.get("player"))
+                    authored = {}  # player -> answer_id of their fake (unless it matched the correct answer)
+                    for aid, entry in enumerate(entries):
+                        if entry["kind"] != "correct":
+                            for author in entry["authors"]:
+                                authored[author] = aid
+                    breakdown = {}
+                    for p in all_players:
+                        # correct pts: did this player guess correctly?
+                        correct_pts = 1 if p in correct_players else 0
+
+                        # fool pts: how many other players chose this player's fake?
+                        p_fake_id = authored.get(p)
+                        fool_pts = 0
+                        if p_fake_id is not None:
+                            fool_pts = picks.get(p_fake_id, 0) - own_picks.get((p, p_fake_id), 0)
+
+                        jury_best_pts = round(best_tally.get(p, 0) / total_jurors, 4)
+                        jury_worst_pts = round(worst_tally.get(p, 0) / total_jurors, 4) if enable_worst_fake else 0
+                        round_total = round(correct_pts + fool_pts + jury_best_pts - jury_worst_pts, 4)
+                        breakdown[p] = {
+                            "correct_pts": correct_pts,
+                            "fool_pts": fool_pts,
+                            "jury_best_pts": jury_best_pts,
+                            "jury_worst_pts": jury_worst_pts,
+                            "round_total": round_total,
+                        }
+
+                    # Include "Predefined Fake" in breakdown if it received any jury votes
+                    pf_key = "Host"
+                    if pf_key in best_tally or pf_key in worst_tally:
+                        pf_jury_best = round(best_tally.get(pf_key, 0) / total_jurors, 4)
+                        pf_jury_worst = round(worst_tally.get(pf_key, 0) / total_jurors, 4) if enable_worst_fake else 0
+                        breakdown[pf_key] = {
+                            "correct_pts": 0,
+                            "fool_pts": 0,
+                            "jury_best_pts": pf_jury_best,
+                            "jury_worst_pts": pf_jury_worst,
+                            "round_total": round(pf_jury_best - pf_jury_worst, 4),
+                        }
+
+                    # store breakdown
+                    active_sessions[code].setdefault("round_breakdown", {})[idx] = breakdown
+
+                    # jury voting is over
+                    active_sessions[code]["jury_phase_active"] = False
+                    active_sessions[code]["jury_phase_payload"] = None
+                    # broadcast round_scores to all
+                    scores_snapshot = dict(active_sessions[code]["scores"])
+                    payload = {
+                        "type": "round_scores",
+                        "breakdown": breakdown,
+                        "scores": scores_snapshot,
+                        "correct_answer": correct,
                     }
-
-                # store breakdown
-                active_sessions[code].setdefault("round_breakdown", {})[idx] = breakdown
-
-                # jury voting is over
-                active_sessions[code]["jury_phase_active"] = False
-                active_sessions[code]["jury_phase_payload"] = None
-                # broadcast round_scores to all
-                scores_snapshot = dict(active_sessions[code]["scores"])
-                payload = {
-                    "type": "round_scores",
-                    "breakdown": breakdown,
-                    "scores": scores_snapshot,
-                    "correct_answer": correct,
-                }
-                await _broadcast(code, payload)
-            elif msg.get("type") == "pause":
-                sess = active_sessions[code]
-                if sess.get("stage_status") == "running":
-                    sess["timer_paused"] = True
-                    sess["stage_status"] = "paused"
-                    await _broadcast(code, {
-                        "type": "timer_update",
-                        "stage": sess["current_stage"],
-                        "remaining": sess["timer_remaining"],
-                        "paused": True,
-                        "status": "paused",
-                    })
-            elif msg.get("type") == "resume":
-                sess = active_sessions[code]
-                if sess.get("stage_status") == "paused":
-                    sess["timer_paused"] = False
-                    sess["stage_status"] = "running"
+                    await _broadcast(code, payload)
+                    # ranked leaderboard with movement since the previous round
+                    board = active_sessions[code]["leaderboard"]
+                    deltas = board.close_round()
+                    active_sessions[code]["rank_deltas"] = deltas
                     await _broadcast(code, {
-                        "type": "timer_update",
-                        "stage": sess["current_stage"],
-                        "remaining": sess["timer_remaining"],
-                        "paused": False,
-                        "status": "running",
+                        "type": "leaderboard",
+                        "top": board.top(LEADERBOARD_PUSH_TOP_K),
+                        "total": len(board),
+                        "deltas": deltas,
                     })
-            elif msg.get("type") == "extend_timer":
-                sess = active_sessions[code]
-                if sess.get("stage_status") in ("running", "paused"):
-                    sess["timer_remaining"] = sess.get("timer_remaining", 0) + 15
-                    await _broadcast(code, {
-                        "type": "timer_update",
-                        "stage": sess["current_stage"],
-                        "remaining": sess["timer_remaining"],
-                        "paused": sess["timer_paused"],
-                        "status": sess["stage_status"],
-                    })
-            elif msg.get("type") == "skip_question":
-                await _cancel_timer(code)
-                sess = active_sessions[code]
-                sess["stage_status"] = "idle"
-                sess["current_stage"] = None
-                await _broadcast(code, {"type": "skip_question"})
-            elif msg.get("type") == "end_game":
-                # new explicit end-game message (keeps "game_finished" for back-compat)
-                await _cancel_timer(code)
-                active_sessions[code]["status"] = "finished"
-                active_sessions[code]["stage_status"] = "idle"
-                await _broadcast(code, {"type": "game_finished"})
-            elif msg.get("type") == "game_finished":
-                # host is ending the game; broadcast to all players
-                await _cancel_timer(code)
-                active_sessions[code]["status"] = "finished"
-                for ws in session_sockets.get(code, [])[:]:
-                    try:
-                        await ws.send_json({"type": "game_finished"})
-                    except Exception:
-                        pass
-            # ignore other message types for now
+                elif msg.get("type") == "pause":
+                    sess = active_sessions[code]
+                    if sess.get("stage_status") == "running":
+                        sess["timer_paused"] = True
+                        sess["stage_status"] = "paused"
+                        await _broadcast(code, {
+                            "type": "timer_update",
+                            "stage": sess["current_stage"],
+                            "remaining": sess["timer_remaining"],
+                            "paused": True,
+                            "status": "paused",
+                        })
+                elif msg.get("type") == "resume":
+                    sess = active_sessions[code]
+                    if sess.get("stage_status") == "paused":
+                        sess["timer_paused"] = False
+                        sess["stage_status"] = "running"
+                        await _broadcast(code, {
+                            "type": "timer_update",
+                            "stage": sess["current_stage"],
+                            "remaining": sess["timer_remaining"],
+                            "paused": False,
+                            "status": "running",
+                        })
+                elif msg.get("type") == "extend_timer":
+                    sess = active_sessions[code]
+                    if sess.get("stage_status") in ("running", "paused"):
+                        sess["timer_remaining"] = sess.get("timer_remaining", 0) + 15
+                        await _broadcast(code, {
+                            "type": "timer_update",
+                            "stage": sess["current_stage"],
+                            "remaining": sess["timer_remaining"],
+                            "paused": sess["timer_paused"],
+                            "status": sess["stage_status"],
+                        })
+                elif msg.get("type") == "skip_question":
+                    await _cancel_timer(code)
+                    sess = active_sessions[code]
+                    sess["stage_status"] = "idle"
+                    sess["current_stage"] = None
+                    await _broadcast(code, {"type": "skip_question"})
+                elif msg.get("type") == "end_game":
+                    # new explicit end-game message (keeps "game_finished" for back-compat)
+                    await _cancel_timer(code)
+                    active_sessions[code]["status"] = "finished"
+                    active_sessions[code]["stage_status"] = "idle"
+                    await _broadcast(code, {"type": "game_finished"})
+                    await _record_analytics(code)
+                elif msg.get("type") == "game_finished":
+                    # host is ending the game; broadcast to all players
+                    await _cancel_timer(code)
+                    active_sessions[code]["status"] = "finished"
+                    await _broadcast(code, {"type": "game_finished"})
+                    await _record_analytics(code)
+                # ignore other message types for now
+            finally:
+                mtype = msg.get("type")
+                metrics.ws_message_seconds.observe(
+                    time.perf_counter() - started,
+                    mtype if isinstance(mtype, str) and mtype in WS_MESSAGE_TYPES else "other")
     except WebSocketDisconnect:
-        print(f"WebSocketDisconnect for room={code}")
         session_sockets[code].remove(websocket)
         # cleanup empty list
         if not session_sockets[code]:
             del session_sockets[code]
-        print(f"Socket removed for {code}; remaining={len(session_sockets.get(code, []))}")
+        log_event(logger, "ws_disconnected", room=code, remaining=len(session_sockets.get(code, [])))
 
 @app.get("/decks")
 async def list_decks(_ok: bool = Depends(require_host)):
@@ -787,10 +1091,13 @@ async def get_deck_details(filename: str, _ok: bool = Depends(require_host)):
     file_path = f"decks/{filename}"
     if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="Deck file not found")
-    
-    result = validate_and_parse_csv(file_path)
 
-    return {"deck_id": filename, "questions": result}
+    # write out pending autosaves first, then parse off the event loop
+    await deck_writer.flush(filename)
+    version = await deck_writer.get_version(filename)
+    result = await asyncio.to_thread(validate_and_parse_csv, file_path)
+
+    return {"deck_id": filename, "questions": result, "version": version}
 
 @app.post("/save-deck")
 async def save_new_deck(deck_data: CreateDeckRequest, _ok: bool = Depends(require_host)):
@@ -799,17 +1106,15 @@ async def save_new_deck(deck_data: CreateDeckRequest, _ok: bool = Depends(requir
     """
     try:
         # Ensure filename ends in .csv
-        fname = deck_data.name if deck_data.name.endswith(".csv") else f"{deck_data.name}.csv"
-        file_path = f"decks/{fname}"
+        fname = sharding.deck_file_name(deck_data.name)
 
         # Convert list of Pydantic models to a list of dicts
         data = [q.dict() for q in deck_data.questions]
-        
-        # Create DataFrame and save to CSV
-        df = pd.DataFrame(data)
-        df.to_csv(file_path, index=False)
-        
-        return {"status": "success", "filename": fname}
+
+        # Atomic write from a worker thread
+        version = await deck_writer.replace(fname, data)
+
+        return {"status": "success", "filename": fname, "version": version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save deck: {str(e)}")
 
@@ -823,12 +1128,40 @@ async def update_deck(filename: str, deck_data: CreateDeckRequest, _ok: bool = D
     if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail=f"Deck '{filename}' not found")
     try:
-        df = pd.DataFrame([q.dict() for q in deck_data.questions])
-        df.to_csv(file_path, index=False)
-        return {"status": "success", "filename": filename}
+        version = await deck_writer.replace(filename, [q.dict() for q in deck_data.questions])
+        return {"status": "success", "filename": filename, "version": version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update deck: {str(e)}")
 
+@app.patch("/decks/{filename}")
+async def patch_deck(filename: str, patch: DeckPatchRequest, _ok: bool = Depends(require_host)):
+    """
+    Question-level edit of a deck (the editor's autosave).
+    Edits are applied in memory and written to disk in coalesced batches.
+    Returns 409 with the current version if the deck changed since base_version.
+    """
+    try:
+        version = await deck_writer.apply_patch(
+            filename,
+            patch.base_version,
+            update=[u.dict() for u in patch.update],
+            add=[q.dict() for q in patch.add],
+            delete=patch.delete,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Deck '{filename}' not found")
+    except deck_writer.VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "filename": filename, "version": version}
+
+@app.on_event("shutdown")
+async def flush_pending_deck_edits():
+    # autosaves still inside the coalescing window must not be lost on restart
+    await deck_writer.flush_all()
+    deck_import.shutdown()
+
 @app.delete("/decks/{filename}")
 async def delete_deck(filename: str, _ok: bool = Depends(require_host)):
     """
@@ -836,11 +1169,23 @@ async def delete_deck(filename: str, _ok: bool = Depends(require_host)):
     """
     file_path = f"decks/{filename}"
     if os.path.exists(file_path):
+        await deck_writer.forget(filename)
         os.remove(file_path)
         return {"message": f"Deleted {filename}"}
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
+@app.post("/decks/import-zip")
+async def import_deck_archive(file: UploadFile = File(...), _ok: bool = Depends(require_host)):
+    """
+    Bulk import: a ZIP of deck CSVs and images (any folder layout).
+    Returns a per-deck report including Image_Link references that were not found.
+    """
+    try:
+        return await deck_import.import_archive(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/decks/{filename}/download")
 async def download_deck_csv(filename: str, _ok: bool = Depends(require_host)):
     """
@@ -851,7 +1196,8 @@ async def download_deck_csv(filename: str, _ok: bool = Depends(require_host)):
     # Check if the file actually exists on the server
     if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="Deck file not found")
-    
+    await deck_writer.flush(filename)
+
     # return the file as a downloadable response
     return FileResponse(
         path=file_path, 
@@ -0,0 +1,201 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Everything here runs on the event loop thread, so updates are plain
+integer/float arithmetic without locks. Histograms use fixed buckets and a
+bisect per observation, which keeps the hot path cheap enough to leave on in
+production. Values that are cheap to read from existing state (active rooms,
+sockets, players) are registered as gauge callbacks and only evaluated when
+/metrics is scraped.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds. Covers sub-millisecond handlers up to multi-second stalls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Number of sockets a broadcast is sent to.
+FANOUT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Seconds a one-second timer tick overshot.
+DRIFT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *label_values: str):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_label_str(self.labels, k)} {_fmt(v)}" for k, v in self._values.items()]
+
+
+class Gauge:
+    """Point-in-time value, either set directly or computed by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float] = None):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> List[str]:
+        value = self.callback() if self.callback else self.value
+        return [f"{self.name} {_fmt(value)}"]
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _fmt(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {_fmt(series[-1])}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {cumulative}")
+        return lines
+
+
+_registry: List = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def gauge_callback(name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+    """Register a gauge whose value is computed only when /metrics is scraped."""
+    return _register(Gauge(name, help_text, callback))
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in Prometheus text format (version 0.0.4)."""
+    out = []
+    for metric in _registry:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.render())
+    return "\n".join(out) + "\n"
+
+
+ws_message_seconds = _register(Histogram(
+    "fip_ws_message_handler_seconds", "Time spent handling one inbound WebSocket message.",
+    labels=("type",)))
+broadcast_seconds = _register(Histogram(
+    "fip_broadcast_seconds", "Time to fan a message out to every socket in a room.",
+    labels=("type",)))
+broadcast_fanout = _register(Histogram(
+    "fip_broadcast_fanout_sockets", "Number of sockets a broadcast was sent to.",
+    buckets=FANOUT_BUCKETS))
+dead_sockets = _register(Counter(
+    "fip_dead_sockets_dropped_total", "Sockets removed from a room after a failed send."))
+timer_drift_seconds = _register(Histogram(
+    "fip_stage_timer_drift_seconds", "How late each one-second stage timer tick fired.",
+    buckets=DRIFT_BUCKETS))
+ws_connections = _register(Counter(
+    "fip_ws_connections_total", "WebSocket connection attempts by outcome.", labels=("outcome",)))
+ws_bytes_sent = _register(Counter(
+    "fip_ws_sent_frame_size_total", "Encoded WebSocket frame size sent, by wire encoding.",
+    labels=("encoding",)))
+ws_messages_dropped = _register(Counter(
+    "fip_ws_messages_dropped_total", "Inbound WebSocket frames dropped because they were not a valid message.",
+    labels=("encoding",)))
+admission_rejected = _register(Counter(
+    "fip_admission_rejected_total", "Requests, sockets and messages rejected by admission control.",
+    labels=("scope",)))
+http_request_seconds = _register(Histogram(
+    "fip_http_request_seconds", "HTTP request latency by route template.",
+    labels=("method", "route", "status")))
+
+
+def _with_label(sample: str, label: str) -> str:
+    series, value = sample.rsplit(" ", 1)
+    if series.endswith("}"):
+        brace = series.index("{")
+        return f"{series[:brace + 1]}{label},{series[brace + 1:]} {value}"
+    return f"{series}{{{label}}} {value}"
+
+
+def merge_expositions(expositions: Dict[str, Optional[str]], label: str = "shard") -> str:
+    """
+    Combine the /metrics output of several worker processes into one
+    exposition: every sample gets a `label` naming its worker and each family
+    keeps a single HELP/TYPE header. Workers that could not be scraped (None)
+    show up as fip_shard_up 0.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for value, text in expositions.items():
+        if text is None:
+            continue
+        tag = f'{label}="{_escape(value)}"'
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split(" ", 3)[2]
+                head = headers.setdefault(family, [])
+                if len(head) < 2 and line not in head:
+                    head.append(line)
+                samples.setdefault(family, [])
+            elif line and family is not None:
+                samples[family].append(_with_label(line, tag))
+    out = ["# HELP fip_shard_up Whether the worker answered this scrape.", "# TYPE fip_shard_up gauge"]
+    out += [f'fip_shard_up{{{label}="{_escape(value)}"}} {0 if text is None else 1}'
+            for value, text in expositions.items()]
+    for family, head in headers.items():
+        out.extend(head)
+        out.extend(samples[family])
+    return "\n".join(out) + "\n"
@@ -0,0 +1,154 @@
+"""
+Wire encodings for /ws/session/{room_code} (and /ws/spectate/{room_code}).
+
+JSON text frames stay the default. A client can opt into compact MessagePack
+binary frames either by offering the `fip.msgpack.v1` WebSocket subprotocol
+or by connecting with `?proto=msgpack`. In MessagePack frames the message
+type is a small integer under key 0 and well-known top-level keys are
+replaced by integer codes (see MESSAGE_TYPES / KEYS); unknown types and keys
+pass through unchanged, so both tables can grow without breaking old clients
+as long as new entries are only appended.
+
+permessage-deflate is negotiated by uvicorn itself (on by default, see
+`--ws-per-message-deflate`), independently of the encoding chosen here.
+
+msgpack is optional: without it every client is served JSON.
+"""
+import json
+from typing import Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+import metrics
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "fip.msgpack.v1"
+
+# Append only: the index is the wire code.
+MESSAGE_TYPES = (
+    "question", "timer_update", "stage_ready", "stage_transition", "answers", "submission",
+    "choice", "fake", "host_next", "results_request", "results", "jury_phase", "jury_vote",
+    "jury_vote_count", "jury_results", "round_scores", "pause", "resume", "extend_timer",
+    "skip_question", "end_game", "game_finished", "cancelled", "timer_error", "leaderboard",
+    "snapshot", "replay", "rate_limited", "spectator_state",
+)
+KEYS = (
+    "type", "stage", "remaining", "paused", "status", "player", "text", "answer", "answers",
+    "index", "question", "correctAnswer", "reason", "from_stage", "to_stage", "count",
+    "total_jurors", "fakes", "enable_worst_fake", "breakdown", "scores", "correct_answer",
+    "correct", "stats", "message", "juror_name", "best_fake_player", "worst_fake_player",
+    "question_index", "top", "total", "deltas", "seq", "messages", "retry_after",
+    "room_code", "players", "jurors", "timer", "submitted", "chosen", "answer_id",
+)
+
+_TYPE_CODE = {name: i for i, name in enumerate(MESSAGE_TYPES)}
+_KEY_CODE = {name: i for i, name in enumerate(KEYS)}
+
+
+class JsonCodec:
+    name = "json"
+
+    @staticmethod
+    def encode(msg: dict) -> str:
+        # same output as WebSocket.send_json
+        return json.dumps(msg, separators=(",", ":"), ensure_ascii=False)
+
+    @staticmethod
+    def decode(frame) -> dict:
+        return json.loads(frame)
+
+    @staticmethod
+    async def send_frame(ws: WebSocket, frame: str):
+        await ws.send_text(frame)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+
+    @staticmethod
+    def encode(msg: dict) -> bytes:
+        packed = {}
+        for key, value in msg.items():
+            if key == "type":
+                value = _TYPE_CODE.get(value, value)
+            packed[_KEY_CODE.get(key, key)] = value
+        return msgpack.packb(packed, use_bin_type=True)
+
+    @staticmethod
+    def decode(frame: bytes) -> dict:
+        packed = msgpack.unpackb(frame, raw=False, strict_map_key=False)
+        msg = {}
+        for key, value in packed.items():
+            if isinstance(key, int) and 0 <= key < len(KEYS):
+                key = KEYS[key]
+            if key == "type" and isinstance(value, int) and 0 <= value < len(MESSAGE_TYPES):
+                value = MESSAGE_TYPES[value]
+            msg[key] = value
+        return msg
+
+    @staticmethod
+    async def send_frame(ws: WebSocket, frame: bytes):
+        await ws.send_bytes(frame)
+
+
+def negotiate(ws: WebSocket):
+    """
+    Pick the codec for a new connection. Returns (codec, subprotocol) where
+    subprotocol must be passed to `ws.accept()` (None when not offered).
+    """
+    offered = ws.scope.get("subprotocols") or []
+    wants_msgpack = MSGPACK_SUBPROTOCOL in offered or ws.query_params.get("proto") == "msgpack"
+    if wants_msgpack and msgpack is not None:
+        return MsgpackCodec, (MSGPACK_SUBPROTOCOL if MSGPACK_SUBPROTOCOL in offered else None)
+    return JsonCodec, None
+
+
+def codec_of(ws: WebSocket):
+    return getattr(ws.state, "codec", JsonCodec)
+
+
+async def send(ws: WebSocket, msg: dict):
+    """Send one message to one socket in that socket's negotiated encoding."""
+    codec = codec_of(ws)
+    frame = codec.encode(msg)
+    metrics.ws_bytes_sent.inc(len(frame), codec.name)
+    await codec.send_frame(ws, frame)
+
+
+async def send_encoded(ws: WebSocket, msg: dict, frames: dict):
+    """
+    Like `send`, but reuses frames already encoded for other sockets in the same
+    fan-out. `frames` is a per-broadcast cache keyed by codec.
+    """
+    codec = codec_of(ws)
+    frame = frames.get(codec)
+    if frame is None:
+        frame = frames[codec] = codec.encode(msg)
+    metrics.ws_bytes_sent.inc(len(frame), codec.name)
+    await codec.send_frame(ws, frame)
+
+
+async def receive(ws: WebSocket) -> Optional[dict]:
+    """
+    Next inbound message. The frame type decides the decoding (text is JSON,
+    binary is MessagePack when available), whatever codec was negotiated.
+    Returns None for a frame that is not a valid message, so the caller can
+    drop it; raises WebSocketDisconnect when the client goes away.
+    """
+    message = await ws.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text, data = message.get("text"), message.get("bytes")
+    codec = JsonCodec if text is not None or msgpack is None else MsgpackCodec
+    try:
+        msg = codec.decode(text if text is not None else data)
+    except Exception:
+        msg = None
+    if not isinstance(msg, dict):
+        metrics.ws_messages_dropped.inc(1, codec.name)
+        return None
+    return msg
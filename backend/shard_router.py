@@ -0,0 +1,290 @@
+"""
+Single-box sharded mode: N game worker processes behind a local router.
+
+    python shard_router.py --workers 4 --port 8000
+
+starts `uvicorn main:app` N times on private ports (SHARD_ID=i, SHARD_COUNT=N)
+and serves the public port with a small stateless ASGI router:
+- requests naming a room (/session-status/{code}, /session/{code}/...,
+  /ws/session/{code}, /ws/spectate/{code}, and /join-session by its JSON
+  body) go to the worker
+  that owns the code (sharding.shard_for);
+- /create-session is spread round robin; the chosen worker mints a code it owns;
+- requests naming a deck (/decks/{filename}[/...], and /save-deck by its
+  JSON body) go to the worker picked by hashing the file name, because a
+  deck under edit is held in that worker's memory (deck_writer);
+- GET /metrics is answered by the router itself: it scrapes every worker
+  and returns one exposition with a shard="i" label on each sample (plus
+  fip_shard_up), so one Prometheus target sees all rooms;
+- everything else (deck list, uploads, ZIP imports, assets, auth) goes to
+  any worker, since decks live on the shared filesystem; a deck's owner
+  notices a replaced file and drops its stale edits (deck_writer).
+
+The router holds no game state, so it can itself run as several uvicorn
+workers (--router-workers). Client IPs are passed on as X-Forwarded-For,
+which uvicorn trusts from localhost, so per-IP admission limits still apply.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import h11
+import websockets
+
+import metrics
+import sharding
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set by the launcher (inherited by router worker processes through the environment)
+WORKER_PORTS = [int(p) for p in os.getenv("SHARD_PORTS", "").split(",") if p]
+
+HOP_BY_HOP = {b"connection", b"keep-alive", b"proxy-connection", b"te", b"trailer", b"upgrade"}
+
+_round_robin = itertools.count()
+
+
+# Requests routed by a field of their (small) JSON body; other bodies are streamed through
+BODY_ROUTED = {"/join-session", "/save-deck"}
+
+
+def _body_field(body: bytes, field: str):
+    try:
+        return str(json.loads(body).get(field, "")) or None
+    except (ValueError, AttributeError):
+        return None
+
+
+def _pick_port(path: str, body: bytes = b"") -> int:
+    code = sharding.room_from_path(path)
+    if code is None and path == "/join-session" and body:
+        code = (_body_field(body, "room_code") or "").upper() or None
+    if code is not None:
+        return WORKER_PORTS[sharding.shard_for(code, len(WORKER_PORTS))]
+    deck = sharding.deck_from_path(path)
+    if deck is None and path == "/save-deck" and body:
+        name = _body_field(body, "name")
+        deck = sharding.deck_file_name(name) if name else None
+    if deck is not None:
+        return WORKER_PORTS[sharding.shard_for(deck, len(WORKER_PORTS))]
+    return WORKER_PORTS[next(_round_robin) % len(WORKER_PORTS)]
+
+
+def _scrape(port: int) -> str:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+        return resp.read().decode()
+
+
+async def _merged_metrics(send):
+    scraped = await asyncio.gather(*(asyncio.to_thread(_scrape, port) for port in WORKER_PORTS),
+                                   return_exceptions=True)
+    body = metrics.merge_expositions({str(shard): (None if isinstance(text, BaseException) else text)
+                                      for shard, text in enumerate(scraped)}).encode()
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+async def _proxy_http(scope, receive, send):
+    path = scope["path"]
+    prefetched = b""
+    if path in BODY_ROUTED:
+        more = True
+        while more:
+            message = await receive()
+            prefetched += message.get("body", b"")
+            more = message.get("more_body", False)
+    port = _pick_port(path, prefetched)
+
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        await send({"type": "http.response.start", "status": 502, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"Shard unavailable"})
+        return
+
+    conn = h11.Connection(h11.CLIENT)
+    headers = [(k, v) for k, v in scope["headers"] if k.lower() not in HOP_BY_HOP and k.lower() != b"x-forwarded-for"]
+    if path in BODY_ROUTED:
+        headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"transfer-encoding")]
+        headers.append((b"content-length", str(len(prefetched)).encode()))
+    headers += [(b"connection", b"close"), (b"x-forwarded-for", _client_ip(scope).encode())]
+    target = scope.get("raw_path") or path.encode()
+    if scope.get("query_string"):
+        target += b"?" + scope["query_string"]
+    try:
+        writer.write(conn.send(h11.Request(method=scope["method"], target=target, headers=headers)))
+        if path in BODY_ROUTED:
+            if prefetched:
+                writer.write(conn.send(h11.Data(data=prefetched)))
+        else:
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                if message.get("body"):
+                    writer.write(conn.send(h11.Data(data=message["body"])))
+                    await writer.drain()
+                more = message.get("more_body", False)
+        writer.write(conn.send(h11.EndOfMessage()))
+        await writer.drain()
+
+        while True:
+            event = conn.next_event()
+            if event is h11.NEED_DATA:
+                conn.receive_data(await reader.read(65536))
+            elif isinstance(event, h11.Response):
+                await send({
+                    "type": "http.response.start",
+                    "status": event.status_code,
+                    "headers": [(k, v) for k, v in event.headers if k.lower() not in HOP_BY_HOP],
+                })
+            elif isinstance(event, h11.Data):
+                await send({"type": "http.response.body", "body": bytes(event.data), "more_body": True})
+            elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                await send({"type": "http.response.body", "body": b""})
+                return
+    finally:
+        writer.close()
+
+
+async def _proxy_ws(scope, receive, send):
+    await receive()  # websocket.connect
+    port = _pick_port(scope["path"])
+    url = f"ws://127.0.0.1:{port}{scope['path']}"
+    if scope.get("query_string"):
+        url += "?" + scope["query_string"].decode()
+    try:
+        upstream = await websockets.connect(
+            url,
+            subprotocols=scope.get("subprotocols") or None,
+            additional_headers=[("X-Forwarded-For", _client_ip(scope))],
+            max_size=None,
+            compression=None,  # loopback hop; the public side negotiates its own deflate
+        )
+    except Exception:
+        await send({"type": "websocket.close", "code": 1011})
+        return
+    await send({"type": "websocket.accept", "subprotocol": upstream.subprotocol})
+
+    async def client_to_upstream():
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                await upstream.close(message.get("code", 1000))
+                return
+            if message.get("text") is not None:
+                await upstream.send(message["text"])
+            elif message.get("bytes") is not None:
+                await upstream.send(message["bytes"])
+
+    async def upstream_to_client():
+        try:
+            async for frame in upstream:
+                if isinstance(frame, str):
+                    await send({"type": "websocket.send", "text": frame})
+                else:
+                    await send({"type": "websocket.send", "bytes": frame})
+        except websockets.ConnectionClosed:
+            pass
+        await send({"type": "websocket.close", "code": upstream.close_code or 1000,
+                    "reason": upstream.close_reason or ""})
+
+    tasks = [asyncio.create_task(client_to_upstream()), asyncio.create_task(upstream_to_client())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await upstream.close()
+
+
+async def app(scope, receive, send):
+    """ASGI entry point of the router."""
+    if scope["type"] == "http":
+        if scope["path"] == "/metrics" and scope["method"] == "GET":
+            await _merged_metrics(send)
+        else:
+            await _proxy_http(scope, receive, send)
+    elif scope["type"] == "websocket":
+        await _proxy_ws(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _wait_ready(port: int, proc: subprocess.Popen, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Worker on port {port} exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Worker on port {port} did not start within {timeout} seconds")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game server as N room-sharded worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="game worker processes")
+    parser.add_argument("--router-workers", type=int, default=1, help="router processes on the public port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="public port")
+    parser.add_argument("--base-port", type=int, default=9100, help="first private worker port")
+    args = parser.parse_args(argv)
+    # make `kill`/service stops run the cleanup below so workers are not orphaned
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = []
+    router = None
+    try:
+        for i, port in enumerate(ports):
+            env = dict(os.environ, SHARD_ID=str(i), SHARD_COUNT=str(args.workers))
+            workers.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+                cwd=BACKEND_DIR, env=env,
+            ))
+        for port, proc in zip(ports, workers):
+            _wait_ready(port, proc)
+        print(f"Sharded server: {args.workers} workers on ports {ports[0]}-{ports[-1]}, "
+              f"router on http://{args.host}:{args.port}")
+        router = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "shard_router:app", "--host", args.host, "--port", str(args.port),
+             "--workers", str(args.router_workers)],
+            cwd=BACKEND_DIR, env=dict(os.environ, SHARD_PORTS=",".join(map(str, ports))),
+        )
+        router.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in workers + ([router] if router else []):
+            proc.terminate()
+        for proc in workers:
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
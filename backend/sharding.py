@@ -0,0 +1,50 @@
+"""
+Room-to-shard mapping for the multi-process mode (see shard_router.py).
+
+Each worker process owns the rooms whose code hashes to its SHARD_ID, and
+only mints room codes it owns, so the router can send every room request to
+the right worker from the code alone. With SHARD_COUNT unset (the normal
+single `uvicorn main:app` deployment) this process owns every room.
+"""
+import os
+import re
+import uuid
+import zlib
+from typing import Optional
+
+SHARD_ID = int(os.getenv("SHARD_ID", "0"))
+SHARD_COUNT = max(1, int(os.getenv("SHARD_COUNT", "1")))
+
+# Paths that carry a room code: /session-status/{code}, /session/{code}[/...],
+# /ws/session/{code}, /ws/spectate/{code}
+_ROOM_PATH = re.compile(r"^/(?:session-status|session|ws/session|ws/spectate)/([^/?]+)")
+# Paths that name one deck: /decks/{filename}[/download] (not /decks/import-zip)
+_DECK_PATH = re.compile(r"^/decks/(?!import-zip$)([^/?]+)")
+
+
+def shard_for(room_code: str, shard_count: int = SHARD_COUNT) -> int:
+    """Stable owner of a room (crc32, not hash(), so every process agrees)."""
+    return zlib.crc32(room_code.upper().encode()) % shard_count
+
+
+def new_room_code(taken=()) -> str:
+    """A fresh 4-character room code owned by this shard and not in `taken`."""
+    while True:
+        code = str(uuid.uuid4())[:4].upper()
+        if code not in taken and shard_for(code) == SHARD_ID:
+            return code
+
+
+def room_from_path(path: str) -> Optional[str]:
+    match = _ROOM_PATH.match(path)
+    return match.group(1).upper() if match else None
+
+
+def deck_from_path(path: str) -> Optional[str]:
+    match = _DECK_PATH.match(path)
+    return match.group(1) if match else None
+
+
+def deck_file_name(name: str) -> str:
+    """Deck file name as /save-deck stores it."""
+    return name if name.endswith(".csv") else f"{name}.csv"
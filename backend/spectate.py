@@ -0,0 +1,140 @@
+"""
+Read-only spectator fan-out (projectors, TAs, lecture-hall watchers).
+
+Spectators connect to /ws/spectate/{room_code} and are kept apart from the
+game sockets: they are not in session_sockets, not players or jurors, get no
+per-player messages or resync, and anything they send is ignored.
+
+Instead of forwarding every broadcast, a room's Hub coalesces changes:
+_broadcast only marks the hub dirty, and at most once per
+SPECTATOR_INTERVAL the hub builds one state frame, encodes it once per codec
+and wakes the watchers. Each watcher has its own sender that always sends
+the latest frame, so a slow watcher skips frames instead of holding up the
+others or the players.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from starlette.websockets import WebSocket
+
+import metrics
+import protocol
+
+SPECTATOR_INTERVAL = float(os.getenv("SPECTATOR_INTERVAL", "0.5"))   # seconds between state frames
+MAX_SPECTATORS_PER_ROOM = int(os.getenv("SPECTATOR_MAX_PER_ROOM", "5000"))
+SEND_TIMEOUT = 10.0  # a watcher that cannot take a frame for this long is disconnected
+
+
+class Hub:
+    def __init__(self, build_state: Callable[[], Optional[dict]]):
+        self.build_state = build_state
+        self.watchers = set()
+        self.version = 0
+        self.state: Optional[dict] = None
+        self._frames: Dict[type, object] = {}
+        self._changed = asyncio.Event()
+        self._publish_task: Optional[asyncio.Task] = None
+        self._last_publish = 0.0
+
+    def frame(self, codec):
+        """Current state encoded for `codec` (encoded once, shared by every watcher)."""
+        frame = self._frames.get(codec)
+        if frame is None:
+            frame = self._frames[codec] = codec.encode(self.state)
+        return frame
+
+    def publish(self):
+        state = self.build_state()
+        if state is None:
+            return
+        self.state = state
+        self._frames = {}
+        self.version += 1
+        self._last_publish = time.monotonic()
+        # wake everyone waiting on the old event; later waiters use the new one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def notify(self):
+        """Mark the room state as changed; the next frame goes out within SPECTATOR_INTERVAL."""
+        if self._publish_task is None or self._publish_task.done():
+            self._publish_task = asyncio.create_task(self._publish_soon())
+
+    async def _publish_soon(self):
+        delay = self._last_publish + SPECTATOR_INTERVAL - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.publish()
+
+    async def wait_for_change(self, seen_version: int):
+        while self.version == seen_version:
+            await self._changed.wait()
+
+    def close(self):
+        if self._publish_task is not None:
+            self._publish_task.cancel()
+
+
+_hubs: Dict[str, Hub] = {}
+
+
+def notify(code: str):
+    hub = _hubs.get(code)
+    if hub is not None and hub.watchers:
+        hub.notify()
+
+
+def watcher_count(code: str) -> int:
+    hub = _hubs.get(code)
+    return len(hub.watchers) if hub else 0
+
+
+async def _send_latest(ws: WebSocket, hub: Hub):
+    codec = protocol.codec_of(ws)
+    seen = 0
+    while True:
+        await hub.wait_for_change(seen)
+        seen = hub.version
+        frame = hub.frame(codec)
+        metrics.ws_bytes_sent.inc(len(frame), codec.name)
+        await asyncio.wait_for(codec.send_frame(ws, frame), SEND_TIMEOUT)
+
+
+async def watch(ws: WebSocket, code: str, build_state: Callable[[], Optional[dict]]):
+    """Serve one accepted spectator socket until it disconnects (or falls too far behind)."""
+    hub = _hubs.get(code)
+    if hub is None:
+        hub = _hubs[code] = Hub(build_state)
+    if len(hub.watchers) >= MAX_SPECTATORS_PER_ROOM:
+        metrics.admission_rejected.inc(1, "spectators_full")
+        await ws.close(code=1013, reason="retry_after=30")
+        return
+    hub.watchers.add(ws)
+    if hub.state is None or len(hub.watchers) == 1:
+        hub.publish()  # nobody was watching, so the cached state may be stale
+    sender = asyncio.create_task(_send_latest(ws, hub))
+    try:
+        # inbound frames are read only to notice the disconnect (and discarded)
+        while not sender.done():
+            receiving = asyncio.ensure_future(ws.receive())
+            await asyncio.wait({receiving, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if not receiving.done():
+                receiving.cancel()
+                break
+            if receiving.result().get("type") == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        failed = (await asyncio.gather(sender, return_exceptions=True))[0]
+        hub.watchers.discard(ws)
+        if isinstance(failed, asyncio.TimeoutError):
+            metrics.dead_sockets.inc(1)
+            try:
+                await ws.close(code=1013, reason="too slow")
+            except Exception:
+                pass
+        if not hub.watchers:
+            hub.close()
+            _hubs.pop(code, None)
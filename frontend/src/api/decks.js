@@ -10,7 +10,7 @@
  * - etc.
  */
 
-import { httpGet, httpPostForm, httpPostJson, httpDelete, httpPutJson } from "./httpClient";
+import { httpGet, httpPostForm, httpPostJson, httpDelete, httpPutJson, httpPatchJson } from "./httpClient";
 import { getHostCode } from "../utils/hostAuth";
 
 /**
@@ -77,6 +77,18 @@ export function updateDeckApi(filename, payload) {
   return httpPutJson(`/decks/${filename}`, payload, hostHeaders());
 }
 
+/**
+ * Save question-level edits (autosave) without resending the whole deck.
+ * @param {string} filename
+ * @param {object} patch  { base_version, update?: [{ Question_ID, ...changed fields }], add?: QuestionModel[], delete?: string[] }
+ * base_version is the "version" returned by the last get/update/patch; a 409 means someone
+ * else changed the deck meanwhile (data.detail.version holds the current version).
+ */
+export function patchDeckApi(filename, patch) {
+  if (!filename) return Promise.resolve({ ok: false, status: 400, data: null, error: "No filename" });
+  return httpPatchJson(`/decks/${filename}`, patch, hostHeaders());
+}
+
 /**
  * Simple helper to infer a deck name from a file.
  */
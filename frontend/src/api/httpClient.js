@@ -148,6 +148,30 @@ export async function httpPutJson(path, body, extraHeaders = {}) {
   }
 }
 
+/**
+ * PATCH JSON helper.
+ * @param {string} path
+ * @param {object} body
+ * @param {object} extraHeaders optional additional headers (ex: X-Host-Code)
+ */
+export async function httpPatchJson(path, body, extraHeaders = {}) {
+  const url = buildUrl(path);
+  try {
+    const res = await fetch(url, {
+      method: "PATCH",
+      headers: {
+        "Content-Type": "application/json",
+        ...extraHeaders,
+      },
+      body: JSON.stringify(body),
+    });
+    const data = await parseResponse(res);
+    return { ok: res.ok, status: res.status, data };
+  } catch (err) {
+    return { ok: false, status: 0, data: null, error: err?.message || String(err) };
+  }
+}
+
 /**
  * DELETE helper.
  * @param {string} path
@@ -4,16 +4,64 @@
 // - Host enters Deck Name
 // - Host adds question rows
 // - Save -> POST /save-deck with JSON: { name, questions }
+// - Edit -> PATCH /decks/{name} with only the changed questions
 // - Show success/error clearly
 //
 // Required columns per your current deck format:
 // Question_ID, Question_Text, Correct_Answer, Predefined_Fake
 
 import React, { useEffect, useMemo, useState } from "react";
-import { saveDeckApi, updateDeckApi, uploadAsset } from "../../api/decks";
+import {
+  saveDeckApi,
+  updateDeckApi,
+  patchDeckApi,
+  uploadAsset,
+} from "../../api/decks";
 import { buildUrl } from "../../api/httpClient";
 import { useDeck } from "../../state/DeckContext.jsx";
 
+const QUESTION_FIELDS = [
+  "Question_Text",
+  "Correct_Answer",
+  "Predefined_Fake",
+  "Image_Link",
+];
+
+/**
+ * Question-level diff between the deck as loaded and the edited rows.
+ * Rows loaded from the deck keep their Question_ID; new rows get fresh IDs.
+ */
+function buildDeckPatch(initialQuestions, finalRows, baseVersion) {
+  const before = new Map(
+    initialQuestions.map((q) => [String(q.Question_ID), q]),
+  );
+  const kept = new Set();
+  const update = [];
+  const add = [];
+  let nextId =
+    Math.max(0, ...initialQuestions.map((q) => Number(q.Question_ID) || 0)) +
+    1;
+
+  finalRows.forEach((r) => {
+    const original = r.Question_ID ? before.get(r.Question_ID) : null;
+    if (!original) {
+      const q = { Question_ID: String(nextId++) };
+      QUESTION_FIELDS.forEach((f) => (q[f] = r[f] || ""));
+      add.push(q);
+      return;
+    }
+    kept.add(r.Question_ID);
+    const change = { Question_ID: r.Question_ID };
+    QUESTION_FIELDS.forEach((f) => {
+      if ((r[f] || "") !== (original[f] || "")) change[f] = r[f] || "";
+    });
+    if (Object.keys(change).length > 1) update.push(change);
+  });
+
+  const remove = [...before.keys()].filter((id) => !kept.has(id));
+  return { base_version: baseVersion, update, add, delete: remove };
+}
+
 function emptyRow() {
   return {
     Question_Text: "",
@@ -52,6 +100,7 @@ export default function DeckCreateCard({
     ) {
       setRows(
         initialDeck.questions.map((q) => ({
+          Question_ID: String(q.Question_ID ?? ""),
           Question_Text: q.Question_Text || "",
           Correct_Answer: q.Correct_Answer || "",
           Predefined_Fake: q.Predefined_Fake || "",
@@ -188,11 +237,33 @@ export default function DeckCreateCard({
       })),
     };
 
-    const res = isEditing
-      ? await updateDeckApi(initialDeck.name, finalPayload)
-      : await saveDeckApi(finalPayload);
+    let res;
+    if (isEditing && initialDeck.version != null) {
+      // send only what changed; the server rejects it if someone else saved meanwhile
+      res = await patchDeckApi(
+        initialDeck.name,
+        buildDeckPatch(
+          initialDeck.questions || [],
+          workRows,
+          initialDeck.version,
+        ),
+      );
+    } else if (isEditing) {
+      res = await updateDeckApi(initialDeck.name, finalPayload);
+    } else {
+      res = await saveDeckApi(finalPayload);
+    }
     setRaw(res.data);
 
+    if (res.status === 409) {
+      setStatus("error");
+      setMessage(
+        "This deck was changed somewhere else since you opened it. Close and reopen it to edit the latest version.",
+      );
+      setBusy(false);
+      return;
+    }
+
     if (!res.ok) {
       setStatus("error");
       setMessage(`Failed to save deck (HTTP ${res.status}).`);
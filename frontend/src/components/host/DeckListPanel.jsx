@@ -165,7 +165,11 @@ export default function DeckListPanel() {
 
   function onEditDeck(deck) {
     if (!deck?.deck_id) return;
-    setEditingDeck({ name: deck.deck_id, questions: getQuestionsArray(deck) });
+    setEditingDeck({
+      name: deck.deck_id,
+      questions: getQuestionsArray(deck),
+      version: deck.version, // lets the editor save just the changed questions
+    });
     setIsEditOpen(true);
   }
 
@@ -49,6 +49,7 @@ export default function PlayerGame() {
   const [currentQuestion, setCurrentQuestion] = useState(null);
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(null);
   const wsRef = useRef(null);
+  const lastSeqRef = useRef(null);
   const [wsConnected, setWsConnected] = useState(false);
 
   // game-specific state
@@ -127,9 +128,13 @@ export default function PlayerGame() {
     let ws;
     let reconnectTimeout;
     let cancelled = false;
+    lastSeqRef.current = null;
 
     function connect() {
-      const wsUrl = buildWsUrl(`/ws/session/${roomCode}`);
+      const lastSeq = lastSeqRef.current;
+      const wsUrl = buildWsUrl(
+        `/ws/session/${roomCode}` + (lastSeq != null ? `?last_seq=${lastSeq}` : ""),
+      );
       ws = new WebSocket(wsUrl);
       wsRef.current = ws;
 
@@ -144,67 +149,76 @@ export default function PlayerGame() {
 
       ws.onerror = () => ws.close();
 
-      ws.onmessage = (evt) => {
-        try {
-          const msg = JSON.parse(evt.data);
-          if (msg.type === "question") {
-            setCurrentQuestionIndex(msg.index);
-            setCurrentQuestion(msg.question);
-            setSessionStatus((prev) => ({
-              ...(prev || {}),
-              status: "in-progress",
-            }));
-            setPhase("submit");
-            setMyFake("");
-            setAnswers([]);
-            setMyChoice(null);
-            setCorrectAnswer(null);
-            setMyRoundBreakdown(null);
-            // reset timer state for the new question
-            setTimerRemaining(null);
-            setTimerPaused(false);
+      const handleMessage = (msg) => {
+        // remember the last sequenced event so a reconnect only replays what was missed
+        if (typeof msg.seq === "number") lastSeqRef.current = msg.seq;
+        if (msg.type === "snapshot" || msg.type === "replay") {
+          (msg.messages || []).forEach(handleMessage);
+          return;
+        }
+        if (msg.type === "question") {
+          setCurrentQuestionIndex(msg.index);
+          setCurrentQuestion(msg.question);
+          setSessionStatus((prev) => ({
+            ...(prev || {}),
+            status: "in-progress",
+          }));
+          setPhase("submit");
+          setMyFake("");
+          setAnswers([]);
+          setMyChoice(null);
+          setCorrectAnswer(null);
+          setMyRoundBreakdown(null);
+          // reset timer state for the new question
+          setTimerRemaining(null);
+          setTimerPaused(false);
+          setTimerStatus("idle");
+          setStageLocked(false);
+          setHasSubmitted(false);
+          setTimerError(null);
+        } else if (msg.type === "timer_update") {
+          setTimerRemaining(msg.remaining);
+          setTimerPaused(msg.paused);
+          setTimerStatus(msg.status);
+          setStageLocked(msg.status === "paused");
+        } else if (msg.type === "stage_ready") {
+          setStageLocked(true);
+          setTimerStatus("ready");
+        } else if (msg.type === "stage_transition") {
+          // Unlock inputs; only clear timer display when moving to an untimed stage (2→3)
+          setStageLocked(false);
+          if (msg.to_stage === 3) {
             setTimerStatus("idle");
-            setStageLocked(false);
-            setHasSubmitted(false);
-            setTimerError(null);
-          } else if (msg.type === "timer_update") {
-            setTimerRemaining(msg.remaining);
-            setTimerPaused(msg.paused);
-            setTimerStatus(msg.status);
-            setStageLocked(msg.status === "paused");
-          } else if (msg.type === "stage_ready") {
-            setStageLocked(true);
-            setTimerStatus("ready");
-          } else if (msg.type === "stage_transition") {
-            // Unlock inputs; only clear timer display when moving to an untimed stage (2→3)
-            setStageLocked(false);
-            if (msg.to_stage === 3) {
-              setTimerStatus("idle");
-              setTimerRemaining(null);
-            }
-          } else if (msg.type === "timer_error") {
-            setTimerError(msg.message);
-            setTimeout(() => setTimerError(null), 3000);
-          } else if (msg.type === "cancelled") {
-            setSessionCancelled(true);
-          } else if (msg.type === "game_finished") {
-            setGameFinished(true);
-          } else if (msg.type === "answers") {
-            setAnswers(msg.answers || []);
-            setPhase("choose");
-          } else if (msg.type === "results") {
-            setCorrectAnswer(msg.correct || "");
-            setPhase("results");
-          } else if (msg.type === "jury_phase") {
-            // Jury is now voting — players wait
-            setPhase("juryWaiting");
-          } else if (msg.type === "round_scores") {
-            const breakdown = msg.breakdown?.[playerName] || {};
-            setMyRoundBreakdown(breakdown);
-            setMyTotalScore(msg.scores?.[playerName] ?? 0);
-            // Stay in results-like phase showing the breakdown
-            setPhase("results");
+            setTimerRemaining(null);
           }
+        } else if (msg.type === "timer_error") {
+          setTimerError(msg.message);
+          setTimeout(() => setTimerError(null), 3000);
+        } else if (msg.type === "cancelled") {
+          setSessionCancelled(true);
+        } else if (msg.type === "game_finished") {
+          setGameFinished(true);
+        } else if (msg.type === "answers") {
+          setAnswers(msg.answers || []);
+          setPhase("choose");
+        } else if (msg.type === "results") {
+          setCorrectAnswer(msg.correct || "");
+          setPhase("results");
+        } else if (msg.type === "jury_phase") {
+          // Jury is now voting — players wait
+          setPhase("juryWaiting");
+        } else if (msg.type === "round_scores") {
+          const breakdown = msg.breakdown?.[playerName] || {};
+          setMyRoundBreakdown(breakdown);
+          setMyTotalScore(msg.scores?.[playerName] ?? 0);
+          // Stay in results-like phase showing the breakdown
+          setPhase("results");
+        }
+      };
+
+      ws.onmessage = (evt) => {
+        try {
+          handleMessage(JSON.parse(evt.data));
         } catch (e) {
           console.error("Invalid ws msg", e);
         }
@@ -483,7 +497,8 @@ export default function PlayerGame() {
                           JSON.stringify({
                             type: "choice",
                             player: playerName,
-                            answer: ans,
+                            // answers are identified by their position in the "answers" list
+                            answer_id: idx,
                           }),
                         );
                       }
@@ -282,10 +282,8 @@ export default function HostLeaderboard() {
         const res = await fetch(buildUrl(`/session-status/${roomCode}`));
         if (res.ok) {
           const data = await res.json();
-          const scoreboard = data.scoreboard || [];
-          const sortedPlayers = scoreboard.sort((a, b) => b[1] - a[1]);
-
-          setPlayers(sortedPlayers);
+          // scoreboard arrives ranked (best first) from the server
+          setPlayers(data.scoreboard || []);
           setPlayerAvatars(data.player_avatars || {});
           setChoices(data.choices || {});
           setSubmissions(data.submissions || {});